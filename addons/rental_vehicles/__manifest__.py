@@ -1,20 +1,24 @@
 {
     "name": "Rental Vehicles",
-    "version": "19.0.1.0",
+    "version": "19.0.1.1",
     "summary": "Управление арендой техники (скутеры, мотоциклы и др.)",
     "category": "Fleet",
     "author": "",
     # "depends": ["base", "mail"],
+    "depends": ["base", "web", "bus"],
     "data": [
         "security/ir.model.access.csv",
         "security/groups.xml",
         "security/ir_rule.xml",
+        "data/ir_cron.xml",
         # "security/security.xml",
         "views/vehicle_type_views.xml",
         "views/vehicle_models.xml",
         "views/vehicle.xml",
         "views/manufacturer.xml",
         "views/order.xml",
+        "views/order_archive.xml",
+        "views/renter.xml",
         "views/office.xml",
         "views/tariff.xml",
         "views/service_type.xml",
@@ -22,13 +26,26 @@
         "views/maintenance_plan.xml",
         "views/maintenance_due_view.xml",
         "views/payout.xml",
+        "views/revenue.xml",
         "views/rental_vehicles_accessory.xml",
         "wizard/renter_photo_wizard.xml",
+        "wizard/training_lesson_recurrence.xml",
+        "wizard/accounting_export_wizard.xml",
+        "wizard/fleet_import_wizard.xml",
+        "wizard/currency_rate_import_wizard.xml",
+        "views/currency_rate.xml",
         "views/rental_vehicles_vehicle_image.xml",
         "views/res_users.xml",
         "views/rental_vehicles_training_lesson.xml",
+        "views/perf_sample.xml",
+        "views/fleet_dashboard.xml",
         "views/menu.xml",
     ],
+    "assets": {
+        "web.assets_backend": [
+            "rental_vehicles/static/src/**/*",
+        ],
+    },
     "installable": True,
     "application": True,
     "auto_install": False,
@@ -0,0 +1,357 @@
+"""Генератор синтетических данных для бенчмарков.
+
+Справочники (офисы, модели, тарифы, планы ТО, техника) создаются через ORM,
+объёмные таблицы (арендаторы, заказы, строки, журнал ТО) - INSERT ... SELECT
+из generate_series. Рассчитан на пустую базу с установленным модулем.
+"""
+import random
+
+from odoo.tools import SQL
+
+
+SCALES = {
+    'small': dict(offices=2, models=5, vehicles=200, managers=2, renters=2_000, orders=20_000, maintenance=2_000),
+    'medium': dict(offices=5, models=20, vehicles=2_000, managers=3, renters=50_000, orders=500_000, maintenance=20_000),
+    'large': dict(offices=10, models=40, vehicles=5_000, managers=4, renters=200_000, orders=2_000_000, maintenance=100_000),
+}
+
+ORDER_STATUSES = [
+    (10, 'Draft', 'draft', 'info'),
+    (20, 'Active', 'active', 'warning'),
+    (30, 'Done', 'done', 'success'),
+    (40, 'Cancelled', 'cancelled', 'danger'),
+]
+
+COUNTRY_CODES = ['TH', 'VN', 'ID', 'GE', 'TR', 'LK', 'PH', 'MY', 'KH', 'LA']
+
+DAY_LADDER = [(1, 1.0), (3, 0.9), (7, 0.8), (14, 0.7), (30, 0.6)]
+HOUR_LADDER = [(1, 0.2), (3, 0.15)]
+
+SERVICE_TYPES = [
+    # (name, interval_km, interval_days)
+    ('Bench Oil Change', 3_000, 0),
+    ('Bench Brake Check', 0, 90),
+    ('Bench Tyres', 8_000, 365),
+]
+
+
+def generate(env, scale='small', seed=42, **overrides):
+    params = {**SCALES[scale], **overrides}
+    rnd = random.Random(seed)
+
+    statuses = _ensure_statuses(env)
+    offices = _create_offices(env, params['offices'])
+    managers = _create_managers(env, offices, params['managers'])
+    vehicle_models = _create_vehicle_models(env, params['models'], rnd)
+    service_types = _create_maintenance_plans(env, vehicle_models)
+    _create_tariffs(env, offices, vehicle_models, rnd)
+    _create_accessories(env, offices)
+    vehicles = _create_vehicles(env, offices, vehicle_models, params['vehicles'], rnd)
+    env.flush_all()
+
+    _insert_renters(env, params['renters'])
+    _insert_orders(env, vehicles, managers, statuses, params['orders'])
+    _insert_maintenance(env, vehicles, service_types, params['maintenance'])
+
+    env['rental_vehicles.renter']._rebuild_aggregates()
+    env['rental_vehicles.maintenance.due']._refresh()
+    env.invalidate_all()
+    env.cr.commit()
+    return params
+
+
+def _ensure_statuses(env):
+    status_model = env['rental_vehicles.order.status']
+    for sequence, name, code, decoration in ORDER_STATUSES:
+        if not status_model._search_by_code(code):
+            status_model.create({
+                'sequence': sequence,
+                'name': name,
+                'code': code,
+                'decoration': decoration,
+            })
+    return {code: status_model._search_by_code(code).id for _s, _n, code, _d in ORDER_STATUSES}
+
+
+def _create_offices(env, count):
+    countries = env['res.country'].search([('code', 'in', COUNTRY_CODES)])
+    offices = env['rental_vehicles.office']
+    for index in range(count):
+        country = countries[index % len(countries)]
+        offices |= offices.create({
+            'city': f'Bench City {index + 1}',
+            'country_id': country.id,
+            'currency_id': country.currency_id.id,
+        })
+    return offices
+
+
+def _create_managers(env, offices, per_office):
+    return env['res.users'].create([
+        {
+            'name': f'Bench Manager {office.id}-{index + 1}',
+            'login': f'bench_manager_{office.id}_{index + 1}',
+            'office_id': office.id,
+            'office_ids': [(6, 0, office.ids)],
+        }
+        for office in offices
+        for index in range(per_office)
+    ])
+
+
+def _create_vehicle_models(env, count, rnd):
+    vehicle_types = env['rental_vehicles.vehicle.type'].create([
+        {'name': 'Bench Scooter'},
+        {'name': 'Bench Motorbike'},
+    ])
+    manufacturers = env['rental_vehicles.manufacturer'].create([
+        {'name': f'Bench Manufacturer {index + 1}'} for index in range(max(1, count // 5))
+    ])
+    return env['rental_vehicles.vehicle.model'].create([
+        {
+            'name': f'Bench Model {index + 1}',
+            'manufacturer_id': manufacturers[index % len(manufacturers)].id,
+            'vehicle_type_id': vehicle_types[index % len(vehicle_types)].id,
+            'displacement': rnd.choice([110, 125, 150, 160, 300]),
+        }
+        for index in range(count)
+    ])
+
+
+def _create_maintenance_plans(env, vehicle_models):
+    service_types = env['rental_vehicles.service.type'].create([
+        {'name': name, 'default_cost': 20} for name, _km, _days in SERVICE_TYPES
+    ])
+    env['rental_vehicles.maintenance.plan'].create([
+        {
+            'model_id': vehicle_model.id,
+            'service_type_id': service_type.id,
+            'interval_km': interval_km,
+            'interval_days': interval_days,
+        }
+        for vehicle_model in vehicle_models
+        for service_type, (_name, interval_km, interval_days) in zip(service_types, SERVICE_TYPES)
+    ])
+    return service_types
+
+
+def _create_tariffs(env, offices, vehicle_models, rnd):
+    vals_list = []
+    for office in offices:
+        for vehicle_model in vehicle_models:
+            day_price = rnd.randint(10, 40)
+            for period_type, ladder in (('day', DAY_LADDER), ('hour', HOUR_LADDER)):
+                for min_period, factor in ladder:
+                    vals_list.append({
+                        'office_id': office.id,
+                        'vehicle_model_id': vehicle_model.id,
+                        'period_type': period_type,
+                        'min_period': min_period,
+                        'price_per_unit': round(day_price * factor, 2),
+                        'currency_id': office.currency_id.id,
+                    })
+    env['rental_vehicles.tariff'].create(vals_list)
+
+
+def _create_accessories(env, offices):
+    env['rental_vehicles.accessory'].create([
+        {'name': name, 'office_id': office.id, 'default_price': price, 'affects_salary': affects_salary}
+        for office in offices
+        for name, price, affects_salary in (('Bench Helmet', 2, True), ('Bench Phone Holder', 1, False))
+    ])
+
+
+def _create_vehicles(env, offices, vehicle_models, count, rnd):
+    return env['rental_vehicles.vehicle'].create([
+        {
+            'office_id': offices[index % len(offices)].id,
+            'model_id': rnd.choice(vehicle_models).id,
+            'plate_number': f'BN {index + 1:05d}',
+            'year': str(rnd.randint(2018, 2025)),
+            'mileage': rnd.randint(1_000, 40_000),
+            'sequence': index,
+        }
+        for index in range(count)
+    ])
+
+
+def _insert_renters(env, count):
+    env.cr.execute(SQL(
+        """
+        INSERT INTO rental_vehicles_renter (
+            name, phone, passport_number, driver_license, active,
+            total_rentals, total_spent,
+            create_uid, create_date, write_uid, write_date
+        )
+        SELECT 'Bench Renter ' || g,
+               '+66' || lpad(g::text, 9, '0'),
+               'BP' || lpad(g::text, 7, '0'),
+               'BL' || lpad(g::text, 7, '0'),
+               TRUE, 0, 0,
+               %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+          FROM generate_series(1, %(count)s) g
+        """,
+        uid=env.uid,
+        count=count,
+    ))
+
+
+def _insert_orders(env, vehicles, managers, statuses, count):
+    """Заказы идут по машинам последовательно с зазором, последний - активный: exclusion constraint не нарушается"""
+    per_vehicle = max(1, count // len(vehicles))
+    env.cr.execute(SQL(
+        """
+        WITH renters AS (
+            SELECT MIN(id) AS first_id, COUNT(*) AS total FROM rental_vehicles_renter
+        ),
+        managers AS (
+            SELECT ARRAY_AGG(id ORDER BY id) AS ids FROM res_users WHERE id IN %(manager_ids)s
+        ),
+        src AS (
+            SELECT v.id AS vehicle_id,
+                   v.name AS vehicle_name,
+                   v.office_id,
+                   v.model_id,
+                   m.vehicle_type_id,
+                   g,
+                   1 + mod(g, 3) AS days,
+                   (now() at time zone 'UTC')
+                       - ((%(per_vehicle)s - g) * interval '4 days')
+                       - interval '1 day' AS start_date
+              FROM rental_vehicles_vehicle v
+              JOIN rental_vehicles_vehicle_model m ON m.id = v.model_id
+             CROSS JOIN generate_series(1, %(per_vehicle)s) g
+             WHERE v.id IN %(vehicle_ids)s
+        )
+        INSERT INTO rental_vehicles_order (
+            name, active, vehicle_id, renter_id, office_id,
+            rental_days, rental_hours, start_date, end_date,
+            start_mileage, end_mileage,
+            status_id, status_code, vehicle_type_id, vehicle_model_id,
+            amount_total, amount_salary_base,
+            create_uid, create_date, write_uid, write_date
+        )
+        SELECT src.vehicle_name, TRUE, src.vehicle_id,
+               renters.first_id + floor(random() * renters.total)::int,
+               src.office_id,
+               src.days, 0, src.start_date, src.start_date + src.days * interval '1 day',
+               src.g * 50, src.g * 50 + 40,
+               CASE
+                   WHEN src.g = %(per_vehicle)s THEN %(active)s
+                   WHEN mod(src.g, 20) = 0 THEN %(cancelled)s
+                   ELSE %(done)s
+               END,
+               CASE
+                   WHEN src.g = %(per_vehicle)s THEN 'active'
+                   WHEN mod(src.g, 20) = 0 THEN 'cancelled'
+                   ELSE 'done'
+               END,
+               src.vehicle_type_id, src.model_id,
+               0, 0,
+               managers.ids[1 + mod(src.vehicle_id + src.g, array_length(managers.ids, 1))],
+               src.start_date, %(uid)s, src.start_date
+          FROM src, renters, managers
+        """,
+        manager_ids=tuple(managers.ids),
+        vehicle_ids=tuple(vehicles.ids),
+        per_vehicle=per_vehicle,
+        active=statuses['active'],
+        cancelled=statuses['cancelled'],
+        done=statuses['done'],
+        uid=env.uid,
+    ))
+
+    env.cr.execute(SQL(
+        """
+        INSERT INTO rental_vehicles_order_line (
+            order_id, name, type, sequence, tariff_id,
+            quantity, price, total, affects_salary,
+            create_uid, create_date, write_uid, write_date
+        )
+        SELECT o.id, 'Tariff', 'tariff', 10, t.id,
+               1, t.price_per_unit, t.price_per_unit * o.rental_days, TRUE,
+               %(uid)s, o.create_date, %(uid)s, o.create_date
+          FROM rental_vehicles_order o
+          JOIN rental_vehicles_tariff t
+            ON t.office_id = o.office_id
+           AND t.vehicle_model_id = o.vehicle_model_id
+           AND t.period_type = 'day'
+           AND t.min_period = 1
+         WHERE o.vehicle_id IN %(vehicle_ids)s
+        UNION ALL
+        SELECT o.id, a.name, 'accessory', 30, NULL,
+               1, a.default_price, a.default_price * o.rental_days, a.affects_salary,
+               %(uid)s, o.create_date, %(uid)s, o.create_date
+          FROM rental_vehicles_order o
+          JOIN rental_vehicles_accessory a ON a.office_id = o.office_id
+         WHERE o.vehicle_id IN %(vehicle_ids)s
+           AND mod(o.id, 5) = 0
+        """,
+        vehicle_ids=tuple(vehicles.ids),
+        uid=env.uid,
+    ))
+
+    env.cr.execute(SQL(
+        """
+        UPDATE rental_vehicles_order o
+           SET amount_total = s.total,
+               amount_salary_base = s.salary_base
+          FROM (
+                SELECT order_id,
+                       SUM(total) AS total,
+                       COALESCE(SUM(total) FILTER (WHERE affects_salary), 0) AS salary_base
+                  FROM rental_vehicles_order_line
+              GROUP BY order_id
+          ) s
+         WHERE s.order_id = o.id
+           AND o.vehicle_id IN %s
+        """,
+        tuple(vehicles.ids),
+    ))
+
+    # последний заказ каждой машины активный
+    env.cr.execute(SQL(
+        "UPDATE rental_vehicles_vehicle SET status = 'rented' WHERE id IN %s",
+        tuple(vehicles.ids),
+    ))
+
+
+def _insert_maintenance(env, vehicles, service_types, count):
+    env.cr.execute(SQL(
+        """
+        WITH v AS (
+            SELECT id, mileage, row_number() OVER (ORDER BY id) AS rn
+              FROM rental_vehicles_vehicle
+             WHERE id IN %(vehicle_ids)s
+        ),
+        inserted AS (
+            INSERT INTO rental_vehicles_maintenance (
+                vehicle_id, date, mileage, total_cost, note,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT v.id,
+                   current_date - floor(random() * 365)::int,
+                   GREATEST(1, v.mileage - floor(random() * v.mileage)::int),
+                   20, 'Bench maintenance',
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM generate_series(1, %(count)s) g
+              JOIN v ON v.rn = 1 + mod(g, %(vehicle_count)s)
+         RETURNING id
+        )
+        INSERT INTO rental_vehicles_maintenance_line (
+            maintenance_id, service_type_id, cost,
+            create_uid, create_date, write_uid, write_date
+        )
+        SELECT inserted.id,
+               (%(service_type_ids)s::int[])[1 + mod(inserted.id, %(service_type_count)s)],
+               20,
+               %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+          FROM inserted
+        """,
+        vehicle_ids=tuple(vehicles.ids),
+        vehicle_count=len(vehicles),
+        service_type_ids=service_types.ids,
+        service_type_count=len(service_types),
+        count=count,
+        uid=env.uid,
+    ))
@@ -0,0 +1,78 @@
+# Точка входа бенчмарков, выполняется внутри odoo shell (env уже в пространстве имён):
+#   odoo shell -d <bench_db> --no-http < addons/rental_vehicles/benchmarks/run.py
+# Параметры через переменные окружения (см. make bench / make bench-data):
+#   BENCH_MODE      generate | run (по умолчанию run)
+#   BENCH_SCALE     small | medium | large - объём данных для generate
+#   BENCH_SCENARIOS сценарии через запятую (по умолчанию все)
+#   BENCH_REPEAT    прогонов на сценарий (по умолчанию 3)
+#   BENCH_OUTPUT    куда сохранить результаты (JSON)
+#   BENCH_BASELINE  JSON предыдущего прогона для сравнения
+#   BENCH_REVISION  ревизия git (make bench берёт её на хосте, в контейнере .git нет)
+import json
+import os
+
+from odoo import fields
+from odoo.addons.rental_vehicles.benchmarks import generate, scenarios
+
+
+def _counts(env):
+    return {
+        model_name: env[model_name].with_context(active_test=False).search_count([])
+        for model_name in (
+            'rental_vehicles.vehicle',
+            'rental_vehicles.renter',
+            'rental_vehicles.order',
+            'rental_vehicles.order.line',
+            'rental_vehicles.maintenance',
+        )
+    }
+
+
+def _compare(results, baseline):
+    print(f"{'scenario':<28}{'wall ms':>12}{'base ms':>12}{'Δ %':>8}{'queries':>10}{'base q':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<28}{result['wall_ms']:>12}{'-':>12}{'-':>8}{result['queries_cold']:>10}{'-':>10}")
+            continue
+        delta = (result['wall_ms'] - base['wall_ms']) / base['wall_ms'] * 100 if base['wall_ms'] else 0
+        print(
+            f"{name:<28}{result['wall_ms']:>12}{base['wall_ms']:>12}{delta:>+8.1f}"
+            f"{result['queries_cold']:>10}{base['queries_cold']:>10}"
+        )
+
+
+def main(env):
+    mode = os.environ.get('BENCH_MODE', 'run')
+
+    if mode == 'generate':
+        params = generate.generate(env, scale=os.environ.get('BENCH_SCALE', 'small'))
+        print(json.dumps({'generated': params, 'counts': _counts(env)}, indent=2))
+        return
+
+    names = [n for n in os.environ.get('BENCH_SCENARIOS', '').split(',') if n]
+    results = scenarios.run(env, names=names, repeat=int(os.environ.get('BENCH_REPEAT', 3)))
+    report = {
+        'meta': {
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'database': env.cr.dbname,
+            'revision': os.environ.get('BENCH_REVISION') or None,
+            'counts': _counts(env),
+        },
+        'results': results,
+    }
+
+    output = os.environ.get('BENCH_OUTPUT', '/tmp/rental_vehicles_bench.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = {}
+    if baseline_path := os.environ.get('BENCH_BASELINE'):
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+
+    _compare(results, baseline)
+    print(f"saved: {output}")
+
+
+main(env)  # noqa: F821 - env приходит из odoo shell
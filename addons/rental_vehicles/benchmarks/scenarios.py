@@ -0,0 +1,137 @@
+"""Сценарии бенчмарков горячих путей rental_vehicles.
+
+Каждый сценарий - функция (env, ctx), ctx готовит prepare_context один раз.
+Замер идёт внутри savepoint, который после прогона откатывается.
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from odoo import fields
+
+
+def prepare_context(env):
+    order_model = env['rental_vehicles.order']
+    env.cr.execute("""
+        SELECT office_id
+          FROM rental_vehicles_order
+      GROUP BY office_id
+      ORDER BY COUNT(*) DESC
+         LIMIT 1
+    """)
+    office = env['rental_vehicles.office'].browse(env.cr.fetchone()[0])
+    vehicles = env['rental_vehicles.vehicle'].search([('office_id', '=', office.id)], limit=500)
+    today = fields.Date.today()
+    month_end = today.replace(day=1) - timedelta(days=1)
+    return {
+        'office': office,
+        'vehicle': vehicles[:1],
+        'vehicles': vehicles,
+        'date_from': month_end.replace(day=1),
+        'date_to': month_end,
+        'active_orders': order_model.search(
+            [('office_id', '=', office.id), ('status_code', '=', 'active')], limit=100
+        ),
+    }
+
+
+def order_list_progress(env, ctx):
+    orders = env['rental_vehicles.order'].search(
+        [('status_code', 'in', ['active', 'done'])], limit=200
+    )
+    orders.read(['name', 'start_date', 'end_date', 'status_code', 'amount_total', 'status_id'])
+
+
+def tariff_onchange(env, ctx):
+    order = env['rental_vehicles.order'].new({
+        'office_id': ctx['office'].id,
+        'vehicle_id': ctx['vehicle'].id,
+        'rental_days': 1,
+    })
+    for days in range(1, 31):
+        order.rental_days = days
+        order._onchange_rental_days()
+
+
+def payout_recalculate(env, ctx):
+    payout = env['rental_vehicles.payout'].create({
+        'office_id': ctx['office'].id,
+        'date_from': ctx['date_from'],
+        'date_to': ctx['date_to'],
+        'currency_rate_snapshot': 1,
+    })
+    payout.action_recalculate()
+
+
+def maintenance_due_office(env, ctx):
+    env['rental_vehicles.maintenance.due'].search_read(
+        [('office_id', '=', ctx['office'].id), ('is_due', '=', True)],
+        ['vehicle_id', 'service_type_id', 'km_to_due', 'days_to_due', 'overdue'],
+    )
+
+
+def maintenance_due_vehicle(env, ctx):
+    ctx['vehicle'].maintenance_due_ids.read(['service_type_id', 'km_to_due', 'days_to_due'])
+
+
+def vehicle_kanban_summary(env, ctx):
+    ctx['vehicles'].read(['name', 'status', 'maintenance_due_summary'])
+
+
+def renter_aggregates_rebuild(env, ctx):
+    env['rental_vehicles.renter']._rebuild_aggregates()
+
+
+def order_end_rental_batch(env, ctx):
+    ctx['active_orders'].action_end_rental()
+
+
+SCENARIOS = {
+    'order_list_progress': order_list_progress,
+    'tariff_onchange': tariff_onchange,
+    'payout_recalculate': payout_recalculate,
+    'maintenance_due_office': maintenance_due_office,
+    'maintenance_due_vehicle': maintenance_due_vehicle,
+    'vehicle_kanban_summary': vehicle_kanban_summary,
+    'renter_aggregates_rebuild': renter_aggregates_rebuild,
+    'order_end_rental_batch': order_end_rental_batch,
+}
+
+
+def measure(env, func, ctx, repeat=3):
+    """Прогоняет сценарий repeat раз: первый прогон - с холодным ormcache"""
+    env.registry.clear_cache()
+    runs = []
+    for _index in range(repeat):
+        env.flush_all()
+        env.invalidate_all()
+        savepoint = env.cr.savepoint(flush=False)
+        try:
+            queries = env.cr.sql_log_count
+            start = time.perf_counter()
+            func(env, ctx)
+            env.flush_all()
+            runs.append((
+                (time.perf_counter() - start) * 1000,
+                env.cr.sql_log_count - queries,
+            ))
+        finally:
+            savepoint.close(rollback=True)
+            env.invalidate_all()
+
+    walls = [wall for wall, _queries in runs]
+    return {
+        'runs': repeat,
+        'wall_ms': round(statistics.median(walls), 2),
+        'wall_ms_min': round(min(walls), 2),
+        'queries_cold': runs[0][1],
+        'queries_warm': runs[-1][1],
+    }
+
+
+def run(env, names=None, repeat=3):
+    ctx = prepare_context(env)
+    return {
+        name: measure(env, SCENARIOS[name], ctx, repeat=repeat)
+        for name in (names or SCENARIOS)
+    }
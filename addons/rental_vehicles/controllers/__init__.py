@@ -0,0 +1,2 @@
+from . import quote
+from . import export
@@ -0,0 +1,48 @@
+from odoo import api, fields, http
+from odoo.http import request, Response, content_disposition
+
+from ..models.accounting_export import EXPORT_HEADERS
+
+
+EXPORT_MIMETYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class RentalExportController(http.Controller):
+
+    @http.route('/rental_vehicles/export/<string:kind>', type='http', auth='user', methods=['GET'])
+    def export(self, kind, date_from, date_to, office_ids='', file_format='csv'):
+        """Потоковая выгрузка: ответ пишется по мере чтения курсора в отдельной транзакции"""
+        if kind not in EXPORT_HEADERS or file_format not in EXPORT_MIMETYPES:
+            return request.not_found()
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        office_ids = [int(office_id) for office_id in office_ids.split(',') if office_id]
+
+        model_name = 'rental_vehicles.manager.payout' if kind == 'manager_payouts' else 'rental_vehicles.order'
+        request.env[model_name].check_access('read')
+
+        # курсор запроса закрывается раньше, чем отдаётся тело ответа
+        registry = request.env.registry
+        uid = request.env.uid
+        context = dict(request.env.context)
+
+        def stream():
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                yield from env['rental_vehicles.accounting.export']._stream(
+                    kind, file_format, date_from, date_to, office_ids,
+                )
+
+        filename = f"{kind}_{date_from}_{date_to}.{file_format}"
+        return Response(
+            stream(),
+            headers=[
+                ('Content-Type', EXPORT_MIMETYPES[file_format]),
+                ('Content-Disposition', content_disposition(filename)),
+                ('X-Accel-Buffering', 'no'),
+            ],
+            direct_passthrough=True,
+        )
@@ -0,0 +1,42 @@
+from odoo import http
+from odoo.exceptions import ValidationError
+from odoo.http import request
+
+
+def quote_int(value, key, index, required=False):
+    """Целое >= 0 из позиции запроса; ошибка ввода - ValidationError, а не 500"""
+    if value in (None, False, ''):
+        if required:
+            raise ValidationError(f"Item {index}: {key} is required")
+        return 0
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Item {index}: {key} must be an integer")
+    if value < 0:
+        raise ValidationError(f"Item {index}: {key} must not be negative")
+    return value
+
+
+class RentalQuoteController(http.Controller):
+
+    @http.route('/rental_vehicles/quote', type='jsonrpc', auth='user')
+    def quote(self, items):
+        """Цены для всего списка техники/сроков за один вызов"""
+        if not isinstance(items, list):
+            raise ValidationError("items must be a list")
+        quote_requests = []
+        for index, item in enumerate(items, start=1):
+            if not isinstance(item, dict):
+                raise ValidationError(f"Item {index}: must be an object")
+            accessory_ids = item.get('accessory_ids') or []
+            if not isinstance(accessory_ids, list):
+                raise ValidationError(f"Item {index}: accessory_ids must be a list")
+            quote_requests.append((
+                quote_int(item.get('vehicle_model_id'), 'vehicle_model_id', index, required=True),
+                quote_int(item.get('office_id'), 'office_id', index, required=True),
+                quote_int(item.get('rental_days'), 'rental_days', index),
+                quote_int(item.get('rental_hours'), 'rental_hours', index),
+                [quote_int(a, 'accessory_ids', index, required=True) for a in accessory_ids],
+            ))
+        return request.env['rental_vehicles.tariff']._quote_batch(quote_requests)
@@ -0,0 +1,74 @@
+"""Перед созданием EXCLUDE-ограничения _vehicle_booking_overlap: пересекающиеся брони одной машины.
+
+Из пары конфликтующих заказов у черновика (при двух черновиках - у более позднего) снимается
+машина - черновик остаётся, но ничего не держит. Конфликты двух активных аренд автоматически
+не решаются, только пишутся в лог: их нужно разобрать вручную, иначе ограничение не создастся.
+"""
+from logging import getLogger
+
+from odoo.tools import SQL
+
+
+_logger = getLogger(__name__)
+
+# BOOKING_STATUS_CODES на момент появления ограничения
+BOOKING_STATUS_CODES = ('draft', 'active')
+# related-поля заказа от vehicle_id, которые сбрасываются вместе с машиной
+VEHICLE_RELATED_COLUMNS = ('vehicle_type_id', 'vehicle_model_id')
+
+
+def _conflicts(cr):
+    cr.execute(SQL(
+        """
+        WITH booking AS (
+            SELECT id, vehicle_id, status_code,
+                   tsrange(start_date, GREATEST(start_date, end_date), '[)') AS booking_range
+              FROM rental_vehicles_order
+             WHERE active AND vehicle_id IS NOT NULL AND status_code IN %s
+        )
+        SELECT a.id, a.status_code, b.id, b.status_code, a.vehicle_id
+          FROM booking a
+          JOIN booking b ON b.vehicle_id = a.vehicle_id
+                        AND b.id > a.id
+                        AND b.booking_range && a.booking_range
+      ORDER BY a.id, b.id
+        """,
+        BOOKING_STATUS_CODES,
+    ))
+    return cr.fetchall()
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    released = set()
+    for first_id, first_status, second_id, second_status, vehicle_id in _conflicts(cr):
+        if first_id in released or second_id in released:
+            continue
+        if second_status == 'draft':
+            released.add(second_id)
+        elif first_status == 'draft':
+            released.add(first_id)
+        else:
+            _logger.warning(
+                "Orders %s and %s are both active on vehicle %s for overlapping periods, resolve them manually",
+                first_id, second_id, vehicle_id,
+            )
+    if not released:
+        return
+
+    cr.execute(SQL(
+        """
+        SELECT column_name
+          FROM information_schema.columns
+         WHERE table_name = 'rental_vehicles_order' AND column_name IN %s
+        """,
+        VEHICLE_RELATED_COLUMNS,
+    ))
+    columns = ['vehicle_id', *(column for column, in cr.fetchall())]
+    cr.execute(SQL(
+        "UPDATE rental_vehicles_order SET %s WHERE id IN %s",
+        SQL(", ").join(SQL("%s = NULL", SQL.identifier(column)) for column in columns),
+        tuple(released),
+    ))
+    _logger.warning("Draft orders %s overlapped other bookings, their vehicle was cleared", sorted(released))
@@ -0,0 +1,95 @@
+"""Переход на уникальность имён справочников без учёта регистра и пробелов (UniqueIndex на lower(trim(name))).
+
+Старые UNIQUE-ограничения удаляются, дубликаты по новому ключу сливаются в запись с меньшим id:
+ссылки переводятся на неё, лишние записи удаляются. Группы, которые слить не удалось
+(конфликт уникальности в ссылающейся таблице), остаются с переименованными дубликатами
+и попадают в лог - иначе новый индекс не создастся.
+"""
+from logging import getLogger
+
+from psycopg2 import IntegrityError
+
+from odoo.tools import SQL
+
+
+_logger = getLogger(__name__)
+
+OLD_CONSTRAINTS = {
+    'rental_vehicles_manufacturer': 'rental_vehicles_manufacturer_name_unique',
+    'rental_vehicles_vehicle_type': 'rental_vehicles_vehicle_type_vehicle_type_name_unique',
+    'rental_vehicles_vehicle_model': 'rental_vehicles_vehicle_model_name_manufacturer_id_unique',
+}
+
+# порядок важен: модели сливаются после производителей, ключ модели включает manufacturer_id
+DUPLICATE_KEYS = (
+    ('rental_vehicles_manufacturer', SQL("lower(trim(name))")),
+    ('rental_vehicles_vehicle_type', SQL("lower(trim(name))")),
+    ('rental_vehicles_vehicle_model', SQL("manufacturer_id, lower(trim(name))")),
+)
+
+
+def _references(cr, table):
+    """[(таблица, колонка)] внешних ключей на table(id)"""
+    cr.execute(SQL(
+        """
+        SELECT cl.relname, att.attname
+          FROM pg_constraint con
+          JOIN pg_class cl ON cl.oid = con.conrelid
+          JOIN pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = con.conkey[1]
+         WHERE con.contype = 'f'
+           AND con.confrelid = %s::regclass
+           AND array_length(con.conkey, 1) = 1
+        """,
+        table,
+    ))
+    return cr.fetchall()
+
+
+def _merge_duplicates(cr, table, key):
+    cr.execute(SQL(
+        """
+        SELECT array_agg(id ORDER BY id)
+          FROM %s
+         WHERE name IS NOT NULL
+      GROUP BY %s
+        HAVING COUNT(*) > 1
+        """,
+        SQL.identifier(table), key,
+    ))
+    groups = [ids for ids, in cr.fetchall()]
+    if not groups:
+        return
+    references = _references(cr, table)
+    for keep_id, *duplicate_ids in groups:
+        try:
+            with cr.savepoint():
+                for ref_table, column in references:
+                    cr.execute(SQL(
+                        "UPDATE %s SET %s = %s WHERE %s IN %s",
+                        SQL.identifier(ref_table), SQL.identifier(column), keep_id,
+                        SQL.identifier(column), tuple(duplicate_ids),
+                    ))
+                cr.execute(SQL("DELETE FROM %s WHERE id IN %s", SQL.identifier(table), tuple(duplicate_ids)))
+            _logger.info("%s: merged duplicates %s into %s", table, duplicate_ids, keep_id)
+        except IntegrityError as error:
+            cr.execute(SQL(
+                "UPDATE %s SET name = name || ' (duplicate #' || id || ')' WHERE id IN %s",
+                SQL.identifier(table), tuple(duplicate_ids),
+            ))
+            _logger.warning(
+                "%s: could not merge duplicates %s into %s (%s), renamed them, please review",
+                table, duplicate_ids, keep_id, error,
+            )
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    for table, constraint in OLD_CONSTRAINTS.items():
+        cr.execute(SQL(
+            "ALTER TABLE %s DROP CONSTRAINT IF EXISTS %s",
+            SQL.identifier(table), SQL.identifier(constraint),
+        ))
+        cr.execute(SQL("DELETE FROM ir_model_constraint WHERE name = %s", constraint))
+    for table, key in DUPLICATE_KEYS:
+        _merge_duplicates(cr, table, key)
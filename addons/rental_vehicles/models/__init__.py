@@ -1,11 +1,19 @@
+from . import perf_monitor
 from . import res_users
+from . import ir_rule
+from . import ir_websocket
 from . import office
+from . import currency_rate
 from . import vehicle_type
 from . import service_type
 from . import vehicle_model
 from . import vehicle
+from . import vehicle_status_history
+from . import fleet_dashboard
 from . import renter
+from . import ocr_job
 from . import order
+from . import order_archive
 from . import tariff
 from . import maintenance
 from . import maintenance_plan
@@ -14,3 +22,6 @@ from . import payout
 from . import rental_vehicles_accessory
 from . import rental_vehicles_vehicle_image
 from . import rental_vehicles_training_lesson
+from . import revenue_ledger
+from . import accounting_export
+from . import fleet_import
@@ -0,0 +1,221 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+
+from odoo import models, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+
+EXPORT_KIND_SELECTION = [
+    ("orders", "Orders"),
+    ("order_lines", "Order Lines"),
+    ("manager_payouts", "Manager Payouts"),
+]
+EXPORT_FORMAT_SELECTION = [
+    ("csv", "CSV"),
+    ("xlsx", "XLSX"),
+]
+# строк на один FETCH из серверного курсора
+EXPORT_CHUNK_SIZE = 2000
+XLSX_READ_CHUNK = 64 * 1024
+
+EXPORT_HEADERS = {
+    "orders": [
+        "Order ID", "Order", "Office", "Vehicle", "Renter", "Manager", "Start", "End", "Status",
+        "Days", "Hours", "Amount", "Salary Base", "Currency",
+    ],
+    "order_lines": [
+        "Order ID", "Order", "Office", "Start", "Line Type", "Description",
+        "Quantity", "Price", "Total", "Affects Salary", "Currency",
+    ],
+    "manager_payouts": [
+        "Payout", "Office", "Date From", "Date To", "Manager", "Revenue", "Revenue Base",
+        "Percent Part", "Fixed Salary", "Total Payout", "Currency",
+    ],
+}
+
+
+class AccountingExport(models.AbstractModel):
+    """Выгрузка для бухгалтерии: строки идут из серверного курсора порциями, память не растёт с объёмом"""
+    _name = "rental_vehicles.accounting.export"
+    _description = "Accounting Export"
+
+    @api.model
+    def _visible_query(self, kind, date_from, date_to, office_ids, archived=False):
+        """Подзапрос id записей с учётом прав и правил доступа; archived - по архиву заказов"""
+        start = datetime.combine(date_from, time.min)
+        stop = datetime.combine(date_to + timedelta(days=1), time.min)
+        if kind == "manager_payouts":
+            domain = [('payout_id.date_from', '>=', date_from), ('payout_id.date_to', '<=', date_to)]
+            if office_ids:
+                domain.append(('payout_id.office_id', 'in', office_ids))
+            model = self.env['rental_vehicles.manager.payout']
+        else:
+            domain = [('start_date', '>=', start), ('start_date', '<', stop)]
+            if office_ids:
+                domain.append(('office_id', 'in', office_ids))
+            model = self.env['rental_vehicles.order.archive' if archived else 'rental_vehicles.order']
+        model.check_access('read')
+        return model._search(domain).subselect()
+
+    @api.model
+    def _order_rows(self, order_table, manager_column, visible):
+        """Заказы из рабочей таблицы или архива - одинаковые колонки для UNION ALL"""
+        return SQL(
+            """
+            SELECT o.id AS order_id, o.name, office.name AS office, v.name AS vehicle, r.name AS renter,
+                   p.name AS manager, o.start_date, o.end_date, o.status_code, o.rental_days,
+                   o.rental_hours, o.amount_total, o.amount_salary_base, cur.name AS currency
+              FROM %(order_table)s o
+         LEFT JOIN rental_vehicles_office office ON office.id = o.office_id
+         LEFT JOIN res_currency cur ON cur.id = office.currency_id
+         LEFT JOIN rental_vehicles_vehicle v ON v.id = o.vehicle_id
+         LEFT JOIN rental_vehicles_renter r ON r.id = o.renter_id
+         LEFT JOIN res_users u ON u.id = %(manager)s
+         LEFT JOIN res_partner p ON p.id = u.partner_id
+             WHERE o.id IN %(visible)s
+            """,
+            order_table=SQL.identifier(order_table),
+            manager=SQL.identifier('o', manager_column),
+            visible=visible,
+        )
+
+    @api.model
+    def _line_rows(self, order_table, line_table, visible):
+        return SQL(
+            """
+            SELECT o.id AS order_id, o.name AS order_name, office.name AS office, o.start_date, l.type,
+                   l.name, l.quantity, l.price, l.total, l.affects_salary, cur.name AS currency,
+                   l.sequence, l.id AS line_id
+              FROM %(line_table)s l
+              JOIN %(order_table)s o ON o.id = l.order_id
+         LEFT JOIN rental_vehicles_office office ON office.id = o.office_id
+         LEFT JOIN res_currency cur ON cur.id = office.currency_id
+             WHERE o.id IN %(visible)s
+            """,
+            line_table=SQL.identifier(line_table),
+            order_table=SQL.identifier(order_table),
+            visible=visible,
+        )
+
+    @api.model
+    def _select(self, kind, visible, archived_visible=None):
+        """Запрос выгрузки; заказы и строки - вместе с архивом (rental_vehicles.order.archive)"""
+        if kind == "orders":
+            return SQL(
+                """
+                SELECT order_id, name, office, vehicle, renter, manager, start_date, end_date,
+                       status_code, rental_days, rental_hours, amount_total, amount_salary_base, currency
+                  FROM (%s UNION ALL %s) orders
+              ORDER BY start_date, order_id
+                """,
+                self._order_rows('rental_vehicles_order', 'create_uid', visible),
+                self._order_rows('rental_vehicles_order_archive', 'manager_id', archived_visible),
+            )
+        if kind == "order_lines":
+            return SQL(
+                """
+                SELECT order_id, order_name, office, start_date, type, name,
+                       quantity, price, total, affects_salary, currency
+                  FROM (%s UNION ALL %s) lines
+              ORDER BY start_date, order_id, sequence, line_id
+                """,
+                self._line_rows('rental_vehicles_order', 'rental_vehicles_order_line', visible),
+                self._line_rows(
+                    'rental_vehicles_order_archive', 'rental_vehicles_order_line_archive', archived_visible,
+                ),
+            )
+        if kind == "manager_payouts":
+            return SQL(
+                """
+                SELECT pay.name, office.name, pay.date_from, pay.date_to, p.name, mp.revenue, mp.revenue_base,
+                       mp.percent_part, mp.salary_fixed_converted, mp.total_payout, cur.name
+                  FROM rental_vehicles_manager_payout mp
+                  JOIN rental_vehicles_payout pay ON pay.id = mp.payout_id
+             LEFT JOIN rental_vehicles_office office ON office.id = pay.office_id
+             LEFT JOIN res_currency cur ON cur.id = pay.currency_id
+             LEFT JOIN res_users u ON u.id = mp.manager_id
+             LEFT JOIN res_partner p ON p.id = u.partner_id
+                 WHERE mp.id IN %s
+              ORDER BY pay.date_from, office.name, p.name, mp.id
+                """,
+                visible,
+            )
+        raise UserError(f"Unknown export: {kind}")
+
+    @api.model
+    def _iter_chunks(self, kind, date_from, date_to, office_ids=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Порции строк через DECLARE ... CURSOR / FETCH, без загрузки выборки целиком"""
+        for model_name in ('rental_vehicles.order', 'rental_vehicles.order.line',
+                           'rental_vehicles.payout', 'rental_vehicles.manager.payout'):
+            self.env[model_name].flush_model()
+        visible = self._visible_query(kind, date_from, date_to, office_ids)
+        archived_visible = None
+        if kind != "manager_payouts":
+            archived_visible = self._visible_query(kind, date_from, date_to, office_ids, archived=True)
+
+        cr = self.env.cr
+        cr.execute(SQL(
+            "DECLARE rental_vehicles_export NO SCROLL CURSOR FOR %s",
+            self._select(kind, visible, archived_visible),
+        ))
+        try:
+            while True:
+                cr.execute(SQL("FETCH %s FROM rental_vehicles_export", chunk_size))
+                rows = cr.fetchall()
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cr.execute("CLOSE rental_vehicles_export")
+
+    @api.model
+    def _stream_csv(self, kind, date_from, date_to, office_ids=None):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_HEADERS[kind])
+        for rows in self._iter_chunks(kind, date_from, date_to, office_ids):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    @api.model
+    def _stream_xlsx(self, kind, date_from, date_to, office_ids=None):
+        """xlsxwriter в режиме constant_memory пишет во временный файл, файл отдаётся кусками"""
+        import xlsxwriter
+
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            workbook = xlsxwriter.Workbook(path, {
+                'constant_memory': True,
+                'default_date_format': 'yyyy-mm-dd hh:mm',
+                'remove_timezone': True,
+            })
+            sheet = workbook.add_worksheet(kind)
+            sheet.write_row(0, 0, EXPORT_HEADERS[kind], workbook.add_format({'bold': True}))
+            row_index = 1
+            for rows in self._iter_chunks(kind, date_from, date_to, office_ids):
+                for row in rows:
+                    sheet.write_row(row_index, 0, row)
+                    row_index += 1
+            workbook.close()
+
+            with open(path, 'rb') as file:
+                while chunk := file.read(XLSX_READ_CHUNK):
+                    yield chunk
+        finally:
+            os.unlink(path)
+
+    @api.model
+    def _stream(self, kind, file_format, date_from, date_to, office_ids=None):
+        if kind not in EXPORT_HEADERS:
+            raise UserError(f"Unknown export: {kind}")
+        if file_format == "xlsx":
+            return self._stream_xlsx(kind, date_from, date_to, office_ids)
+        return self._stream_csv(kind, date_from, date_to, office_ids)
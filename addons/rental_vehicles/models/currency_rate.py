@@ -0,0 +1,203 @@
+import csv
+import io
+from logging import getLogger
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+from odoo.tools.lru import LRU
+
+
+_logger = getLogger(__name__)
+
+# (db, версия, currency_id, date) -> курс (0 - курса нет); версия сдвигается при каждом изменении таблицы
+_rate_cache = LRU(8192)
+RATE_VERSION_SEQUENCE = 'rental_vehicles_currency_rate_version_seq'
+
+RATE_SOURCE_SELECTION = [
+    ("file", "File"),
+    ("provider", "Provider"),
+    ("manual", "Manual"),
+]
+
+
+class CurrencyRate(models.Model):
+    """Локальные курсы: сколько единиц валюты за 1 USD на дату"""
+    _name = "rental_vehicles.currency.rate"
+    _description = "Currency Rate (per USD)"
+    _order = "date desc, currency_id"
+    _log_access = False
+
+    _currency_date_unique = models.Constraint(
+        'UNIQUE(currency_id, date)',
+        'Only one rate per currency and date is allowed!'
+    )
+
+    currency_id = fields.Many2one("res.currency", required=True, ondelete="cascade")
+    date = fields.Date(required=True, default=fields.Date.context_today)
+    rate = fields.Float("Units per USD", required=True)
+    source = fields.Selection(RATE_SOURCE_SELECTION, default="manual", required=True)
+
+    def init(self):
+        self.env.cr.execute(SQL("CREATE SEQUENCE IF NOT EXISTS %s", SQL.identifier(RATE_VERSION_SEQUENCE)))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rates = super().create(vals_list)
+        self._bump_version()
+        return rates
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._bump_version()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._bump_version()
+        return res
+
+    @api.model
+    def _bump_version(self):
+        """Сдвигает версию кэша курсов сейчас и ещё раз после коммита.
+
+        Второй сдвиг отбрасывает курсы, которые другие воркеры успели закэшировать до коммита.
+        """
+        bump = SQL("SELECT nextval(%s)", RATE_VERSION_SEQUENCE)
+        self.env.cr.execute(bump)
+        registry = self.env.registry
+
+        @self.env.cr.postcommit.add
+        def bump_after_commit():
+            with registry.cursor() as cr:
+                cr.execute(bump)
+
+    @api.model
+    def _get_rates(self, keys):
+        """{(currency_id, date): курс} - из кэша, недостающие одним запросом; USD всегда 1"""
+        usd_id = self.env.ref('base.USD').id
+        cr = self.env.cr
+        cr.execute(SQL("SELECT last_value FROM %s", SQL.identifier(RATE_VERSION_SEQUENCE)))
+        version = cr.fetchone()[0]
+
+        rates, missing = {}, []
+        for key in set(keys):
+            rate = 1.0 if key[0] == usd_id else _rate_cache.get((cr.dbname, version, *key))
+            if rate is None:
+                missing.append(key)
+            elif rate:
+                rates[key] = rate
+        if not missing:
+            return rates
+
+        self.flush_model()
+        cr.execute(SQL(
+            """
+            SELECT k.currency_id, k.date, r.rate
+              FROM unnest(%s::int[], %s::date[]) AS k(currency_id, date)
+              JOIN LATERAL (
+                    SELECT rate
+                      FROM rental_vehicles_currency_rate
+                     WHERE currency_id = k.currency_id
+                       AND date <= k.date
+                  ORDER BY date DESC
+                     LIMIT 1
+                   ) r ON TRUE
+            """,
+            [currency_id for currency_id, _date in missing],
+            [date for _currency_id, date in missing],
+        ))
+        found = {(currency_id, date): rate for currency_id, date, rate in cr.fetchall()}
+        for key in missing:
+            _rate_cache[(cr.dbname, version, *key)] = found.get(key, 0.0)
+        rates.update(found)
+        return rates
+
+    @api.model
+    def _convert_rows(self, rows, to_currency):
+        """rows: [(сумма, currency_id, дата)] -> суммы в to_currency, курсы берутся одним запросом.
+
+        Для сводных отчётов по офисам с разными валютами вместо res.currency._convert на каждую запись.
+        """
+        rows = list(rows)
+        keys = {(currency_id, date) for _amount, currency_id, date in rows}
+        keys |= {(to_currency.id, date) for _amount, _currency_id, date in rows}
+        rates = self._get_rates(keys)
+        missing = sorted({key for key in keys if not rates.get(key)}, key=lambda key: (key[1], key[0]))
+        if missing:
+            currencies = self.env['res.currency'].browse({currency_id for currency_id, _date in missing})
+            names = dict(zip(currencies.ids, currencies.mapped('name')))
+            raise UserError("No exchange rate for: " + ", ".join(
+                f"{names[currency_id]} on {date}" for currency_id, date in missing
+            ))
+        return [
+            to_currency.round(amount / rates[currency_id, date] * rates[to_currency.id, date])
+            for amount, currency_id, date in rows
+        ]
+
+    @api.model
+    def _store_rates(self, rates, source):
+        """rates: [(currency_id, date, курс)] - upsert одним запросом по (валюта, дата)"""
+        rates = [(currency_id, date, rate) for currency_id, date, rate in rates if rate > 0]
+        if not rates:
+            return 0
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO rental_vehicles_currency_rate (currency_id, date, rate, source)
+            SELECT currency_id, date, rate, %s
+              FROM unnest(%s::int[], %s::date[], %s::float8[]) AS r(currency_id, date, rate)
+                ON CONFLICT (currency_id, date)
+                DO UPDATE SET rate = EXCLUDED.rate, source = EXCLUDED.source
+            """,
+            source,
+            [currency_id for currency_id, _date, _rate in rates],
+            [date for _currency_id, date, _rate in rates],
+            [rate for _currency_id, _date, rate in rates],
+        ))
+        self.invalidate_model()
+        self._bump_version()
+        return len(rates)
+
+    @api.model
+    def _import_csv(self, content: bytes):
+        """CSV с колонками currency (код ISO), date (YYYY-MM-DD), rate (единиц за 1 USD)"""
+        reader = csv.DictReader(io.StringIO(content.decode('utf-8-sig')))
+        rows = list(reader)
+        codes = {(row.get('currency') or '').strip().upper() for row in rows}
+        currencies = self.env['res.currency'].with_context(active_test=False).search_fetch(
+            [('name', 'in', list(codes))], ['name'],
+        )
+        currency_ids = {currency.name: currency.id for currency in currencies}
+        rates = []
+        for row_number, row in enumerate(rows, start=2):
+            code = (row.get('currency') or '').strip().upper()
+            if code not in currency_ids:
+                raise UserError(f"Row {row_number}: unknown currency '{code}'")
+            try:
+                rates.append((currency_ids[code], fields.Date.to_date(row['date'].strip()), float(row['rate'])))
+            except (KeyError, ValueError, AttributeError):
+                raise UserError(f"Row {row_number}: invalid date or rate")
+        return self._store_rates(rates, "file")
+
+    @api.model
+    def _fetch_provider_rates(self, date):
+        """Заглушка внешнего провайдера: курсы res.currency.rate компании, пересчитанные к USD"""
+        usd = self.env.ref('base.USD')
+        currencies = self.env['rental_vehicles.office'].sudo().search([]).currency_id - usd
+        if not currencies:
+            return []
+        company_rates = (currencies | usd)._get_rates(self.env.company, date)
+        if not company_rates.get(usd.id):
+            return []
+        return [
+            (currency.id, date, company_rates[currency.id] / company_rates[usd.id])
+            for currency in currencies
+            if company_rates.get(currency.id)
+        ]
+
+    @api.model
+    def _cron_update_rates(self):
+        today = fields.Date.context_today(self)
+        stored = self._store_rates(self._fetch_provider_rates(today), "provider")
+        _logger.info("Currency rates: %s rates stored for %s", stored, today)
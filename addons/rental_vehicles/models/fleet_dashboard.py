@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+from .perf_monitor import instrumented
+
+
+FLEET_STATUS_NOTIFICATION = "rental_vehicles.fleet_status"
+# общий канал: только сигнал о новом офисе, без счётчиков
+FLEET_OFFICES_CHANNEL = "rental_vehicles.fleet"
+# окно крона _cron_notify_overdue, с запасом относительно его интервала
+FLEET_OVERDUE_WINDOW_MINUTES = 10
+
+# поля машины, меняющие её ячейку дашборда (офис x тип x статус)
+FLEET_CELL_VEHICLE_FIELDS = {'status', 'office_id', 'model_id'}
+# поля заказа, от которых зависит счётчик просроченных аренд
+FLEET_OVERDUE_ORDER_FIELDS = {'vehicle_id', 'status_code', 'end_date', 'active'}
+
+
+FLEET_CHANNEL_PREFIX = "rental_vehicles.fleet."
+
+
+def fleet_channel(office_id):
+    return f"{FLEET_CHANNEL_PREFIX}{office_id}"
+
+
+def fleet_channel_office(channel):
+    """office_id канала офиса или None для любого другого канала"""
+    if isinstance(channel, str) and channel.startswith(FLEET_CHANNEL_PREFIX):
+        office_id = channel[len(FLEET_CHANNEL_PREFIX):]
+        return int(office_id) if office_id.isdigit() else 0
+    return None
+
+
+class FleetDashboard(models.AbstractModel):
+    _name = "rental_vehicles.fleet.dashboard"
+    _description = "Fleet Dashboard"
+
+    @api.model
+    def _query_cells(self, vehicle_ids):
+        """Ячейки офис x тип x статус со счётчиками машин, просроченных аренд и ТО - одним запросом.
+
+        vehicle_ids - подзапрос (SQL) или кортеж id машин.
+        """
+        self.env['rental_vehicles.vehicle'].flush_model(['status', 'office_id', 'model_id'])
+        self.env['rental_vehicles.vehicle.model'].flush_model(['vehicle_type_id'])
+        self.env['rental_vehicles.order'].flush_model(['vehicle_id', 'active', 'status_code', 'end_date'])
+        self.env['rental_vehicles.maintenance.due'].flush_model(['vehicle_id', 'is_due', 'overdue'])
+
+        self.env.cr.execute(SQL(
+            """
+            SELECT v.office_id, m.vehicle_type_id, v.status,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE overdue.vehicle_id IS NOT NULL),
+                   COUNT(*) FILTER (WHERE due.vehicle_id IS NOT NULL)
+              FROM rental_vehicles_vehicle v
+              JOIN rental_vehicles_vehicle_model m ON m.id = v.model_id
+         LEFT JOIN (SELECT DISTINCT vehicle_id
+                      FROM rental_vehicles_order
+                     WHERE active AND status_code = 'active' AND end_date < %(now)s) overdue
+                   ON overdue.vehicle_id = v.id
+         LEFT JOIN (SELECT DISTINCT vehicle_id
+                      FROM rental_vehicles_maintenance_due
+                     WHERE is_due OR overdue) due
+                   ON due.vehicle_id = v.id
+             WHERE v.id IN %(vehicle_ids)s
+          GROUP BY v.office_id, m.vehicle_type_id, v.status
+            """,
+            now=fields.Datetime.now(),
+            vehicle_ids=vehicle_ids,
+        ))
+        return [
+            {
+                "office_id": office_id,
+                "vehicle_type_id": vehicle_type_id or False,
+                "status": status,
+                "count": count,
+                "overdue": overdue,
+                "maintenance_due": maintenance_due,
+            }
+            for office_id, vehicle_type_id, status, count, overdue, maintenance_due in self.env.cr.fetchall()
+        ]
+
+    @api.model
+    @instrumented
+    def get_dashboard_data(self):
+        """Начальное состояние дашборда; видимость машин и офисов - с учётом правил доступа"""
+        Vehicle = self.env['rental_vehicles.vehicle']
+        cells = self._query_cells(Vehicle._search([]).subselect())
+
+        offices = self.env['rental_vehicles.office'].browse({c["office_id"] for c in cells})
+        vehicle_types = self.env['rental_vehicles.vehicle.type'].browse(
+            {c["vehicle_type_id"] for c in cells if c["vehicle_type_id"]}
+        )
+        # подписка на все доступные офисы: первая машина в пустом офисе тоже придёт через шину
+        subscribed = self.env['rental_vehicles.office'].search([])
+        return {
+            "offices": [{"id": o.id, "name": o.display_name} for o in offices.sorted('name')],
+            "vehicle_types": [{"id": t.id, "name": t.display_name} for t in vehicle_types.sorted('name')],
+            "statuses": Vehicle._fields['status']._description_selection(self.env),
+            "cells": cells,
+            "channels": [FLEET_OFFICES_CHANNEL] + [fleet_channel(office_id) for office_id in subscribed.ids],
+        }
+
+    @api.model
+    def _fleet_cells(self, vehicles):
+        """vehicle_id -> (office_id, vehicle_type_id, status)"""
+        return {
+            vehicle.id: (vehicle.office_id.id, vehicle.vehicle_type_id.id or False, vehicle.status)
+            for vehicle in vehicles
+        }
+
+    @api.model
+    def _notify_cells(self, before, after):
+        """Офисы, где ячейка машины поменялась (before/after - результаты _fleet_cells), уходят в _notify_offices"""
+        office_ids = set()
+        for vehicle_id in before.keys() | after.keys():
+            old, new = before.get(vehicle_id), after.get(vehicle_id)
+            if old != new:
+                office_ids.update(cell[0] for cell in (old, new) if cell)
+        self._notify_offices(office_ids)
+
+    @api.model
+    def _notify_offices(self, office_ids):
+        """Шлёт в шину все ячейки офисов заново посчитанными: машины, просрочки и ТО"""
+        office_ids = tuple({office_id for office_id in office_ids if office_id})
+        if not office_ids:
+            return
+        cells = self._query_cells(SQL(
+            "SELECT id FROM rental_vehicles_vehicle WHERE office_id IN %s", office_ids,
+        ))
+        by_office = {office_id: [] for office_id in office_ids}
+        for cell in cells:
+            by_office[cell["office_id"]].append(cell)
+        self.env['bus.bus']._sendmany([
+            (fleet_channel(office_id), FLEET_STATUS_NOTIFICATION, {"office_id": office_id, "cells": office_cells})
+            for office_id, office_cells in by_office.items()
+        ])
+
+    @api.model
+    def _notify_new_offices(self, offices):
+        self.env['bus.bus']._sendmany([
+            (FLEET_OFFICES_CHANNEL, FLEET_STATUS_NOTIFICATION, {"office_id": office.id, "cells": []})
+            for office in offices
+        ])
+
+    @api.model
+    def _cron_notify_overdue(self, window_minutes=FLEET_OVERDUE_WINDOW_MINUTES):
+        """Аренды становятся просроченными без записи в базу - офисы с такими заказами обновляем по крону"""
+        now = fields.Datetime.now()
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT v.office_id
+              FROM rental_vehicles_order o
+              JOIN rental_vehicles_vehicle v ON v.id = o.vehicle_id
+             WHERE o.active AND o.status_code = 'active'
+               AND o.end_date >= %s AND o.end_date < %s
+            """,
+            now - timedelta(minutes=window_minutes), now,
+        ))
+        self._notify_offices(office_id for office_id, in self.env.cr.fetchall())
@@ -0,0 +1,326 @@
+import csv
+import io
+
+from psycopg2 import IntegrityError
+
+from odoo import models, api
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL
+
+from .perf_monitor import instrumented
+
+
+# колонки файла: kind (vehicle | tariff | plan), manufacturer, model, vehicle_type,
+# vehicle: plate_number, year, mileage, purchase_price;
+# характеристики новой модели: displacement, max_power, top_speed, weight;
+# tariff: period_type, min_period, price; plan: service_type, interval_km, interval_days
+FLEET_IMPORT_KINDS = ('vehicle', 'tariff', 'plan')
+MODEL_SPEC_FIELDS = {
+    'displacement': float,
+    'max_power': float,
+    'top_speed': int,
+    'weight': float,
+}
+TARIFF_PERIOD_TYPES = ('hour', 'day')
+
+
+def name_key(value):
+    """Ключ сравнения имён справочников: как в проверках уникальности (trim + регистр)"""
+    return (value or '').strip().lower()
+
+
+class RowError(Exception):
+    pass
+
+
+class FleetImport(models.AbstractModel):
+    """Импорт парка одним файлом: справочники ищутся одним запросом на таблицу, всё создаётся пачками"""
+    _name = "rental_vehicles.fleet.import"
+    _description = "Fleet Import"
+
+    @api.model
+    def _read_file(self, content: bytes, filename: str):
+        """Строки файла как dict колонка -> строка; поддерживаются CSV и XLSX"""
+        if (filename or '').lower().endswith('.xlsx'):
+            try:
+                import openpyxl
+            except ImportError:
+                raise UserError("XLSX import requires the openpyxl library, please upload a CSV file.")
+            sheet = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True).active
+            rows = sheet.iter_rows(values_only=True)
+            header = [name_key(str(cell or '')) for cell in next(rows, ())]
+            return [
+                {column: '' if value is None else str(value).strip() for column, value in zip(header, row)}
+                for row in rows
+                if any(value not in (None, '') for value in row)
+            ]
+        text = content.decode('utf-8-sig')
+        reader = csv.DictReader(io.StringIO(text), dialect=csv.Sniffer().sniff(text[:4096], ',;\t'))
+        reader.fieldnames = [name_key(column) for column in reader.fieldnames or ()]
+        return [
+            {column: (value or '').strip() for column, value in row.items() if column}
+            for row in reader
+            if any((value or '').strip() for value in row.values() if isinstance(value, str))
+        ]
+
+    @api.model
+    def _lookup_by_name(self, model_name, names, extra_column=None):
+        """lower(trim(name)) [+ extra_column] -> id одним запросом"""
+        keys = {name_key(name) for name in names if name}
+        if not keys:
+            return {}
+        model = self.env[model_name]
+        model.flush_model()
+        if extra_column:
+            select = SQL("%s, lower(trim(name)), id", SQL.identifier(extra_column))
+        else:
+            select = SQL("lower(trim(name)), id")
+        self.env.cr.execute(SQL(
+            "SELECT %s FROM %s WHERE lower(trim(name)) IN %s ORDER BY id",
+            select, SQL.identifier(model._table), tuple(keys),
+        ))
+        found = {}
+        for *key, record_id in self.env.cr.fetchall():
+            found.setdefault(tuple(key) if extra_column else key[0], record_id)
+        return found
+
+    @api.model
+    @instrumented
+    def _import_rows(self, rows, office):
+        """rows - результат _read_file. Возвращает (счётчики созданного, [(номер строки, ошибка)])"""
+        errors = []
+        parsed = []
+        for row_number, row in enumerate(rows, start=2):
+            kind = name_key(row.get('kind')) or 'vehicle'
+            if kind not in FLEET_IMPORT_KINDS:
+                errors.append((row_number, f"Unknown kind '{row.get('kind')}'"))
+                continue
+            if not (row.get('manufacturer') and row.get('model')):
+                errors.append((row_number, "Manufacturer and model are required"))
+                continue
+            parsed.append((row_number, kind, row))
+
+        counts = dict.fromkeys(('manufacturers', 'vehicle_types', 'models', 'vehicles', 'tariffs', 'plans'), 0)
+
+        # справочники: один поиск на таблицу, недостающие - одним create
+        manufacturer_ids = self._resolve_names(
+            'rental_vehicles.manufacturer', [row['manufacturer'] for _n, _k, row in parsed], counts, 'manufacturers',
+        )
+        type_ids = self._resolve_names(
+            'rental_vehicles.vehicle.type',
+            [row['vehicle_type'] for _n, _k, row in parsed if row.get('vehicle_type')],
+            counts, 'vehicle_types',
+        )
+        model_ids, parsed = self._resolve_models(parsed, manufacturer_ids, type_ids, counts, errors)
+
+        vehicles, tariffs, plans = [], [], []
+        for row_number, kind, row in parsed:
+            model_id = model_ids[name_key(row['manufacturer']), name_key(row['model'])]
+            try:
+                if kind == 'vehicle':
+                    vehicles.append((row_number, self._vehicle_vals(row, model_id, office)))
+                elif kind == 'tariff':
+                    tariffs.append((row_number, self._tariff_vals(row, model_id, office)))
+                else:
+                    plans.append((row_number, row))
+            except RowError as error:
+                errors.append((row_number, str(error)))
+
+        Vehicle = self.env['rental_vehicles.vehicle']
+        vehicles = self._drop_duplicates(
+            vehicles, lambda vals: vals['plate_number'],
+            self._existing_keys(Vehicle, ['plate_number'], lambda rec: rec.plate_number,
+                                [('plate_number', 'in', [vals['plate_number'] for _n, vals in vehicles])]),
+            "Plate number {} already exists", errors,
+        )
+        Tariff = self.env['rental_vehicles.tariff']
+        tariff_key = lambda vals: (vals['vehicle_model_id'], vals['period_type'], vals['min_period'])
+        tariffs = self._drop_duplicates(
+            tariffs, tariff_key,
+            self._existing_keys(Tariff, ['vehicle_model_id', 'period_type', 'min_period'],
+                                lambda rec: (rec.vehicle_model_id.id, rec.period_type, rec.min_period),
+                                [('office_id', '=', office.id),
+                                 ('vehicle_model_id', 'in', list({vals['vehicle_model_id'] for _n, vals in tariffs}))]),
+            "Tariff {} already exists for this office", errors,
+        )
+
+        service_type_ids = self._lookup_by_name(
+            'rental_vehicles.service.type', [row.get('service_type') for _n, row in plans],
+        )
+        plan_vals = []
+        for row_number, row in plans:
+            try:
+                plan_vals.append((row_number, self._plan_vals(
+                    row, model_ids[name_key(row['manufacturer']), name_key(row['model'])], service_type_ids,
+                )))
+            except RowError as error:
+                errors.append((row_number, str(error)))
+        Plan = self.env['rental_vehicles.maintenance.plan']
+        plan_vals = self._drop_duplicates(
+            plan_vals, lambda vals: (vals['model_id'], vals['service_type_id']),
+            self._existing_keys(Plan, ['model_id', 'service_type_id'],
+                                lambda rec: (rec.model_id.id, rec.service_type_id.id),
+                                [('model_id', 'in', list({vals['model_id'] for _n, vals in plan_vals}))]),
+            "Maintenance plan {} already exists", errors,
+        )
+
+        # по одному create на модель: constraints, computes и хуки (ТО, история, кэш тарифов) - на пачку
+        counts['vehicles'] = len(self._create_rows(Vehicle, vehicles, errors))
+        counts['tariffs'] = len(self._create_rows(Tariff, tariffs, errors))
+        counts['plans'] = len(self._create_rows(Plan, plan_vals, errors))
+        return counts, sorted(errors)
+
+    def _create_rows(self, model, items, errors):
+        """Пачка [(номер строки, vals)] одним create в savepoint; если пачка не прошла
+        ограничения, делим её пополам, пока ошибка не останется за конкретной строкой"""
+        if not items:
+            return model.browse()
+        try:
+            with self.env.cr.savepoint():
+                return model.create([vals for _n, vals in items])
+        except (ValidationError, IntegrityError) as error:
+            if len(items) == 1:
+                errors.append((items[0][0], str(error).strip()))
+                return model.browse()
+        middle = len(items) // 2
+        return self._create_rows(model, items[:middle], errors) | self._create_rows(model, items[middle:], errors)
+
+    def _resolve_names(self, model_name, names, counts, counter):
+        found = self._lookup_by_name(model_name, names)
+        missing = {}
+        for name in names:
+            key = name_key(name)
+            if key and key not in found:
+                missing.setdefault(key, name.strip())
+        if missing:
+            created = self.env[model_name].create([{'name': name} for name in missing.values()])
+            found.update(zip(missing, created.ids))
+            counts[counter] = len(created)
+        return found
+
+    def _resolve_models(self, parsed, manufacturer_ids, type_ids, counts, errors):
+        """(производитель, модель) -> id; новые модели создаются одним create, строки без типа отбрасываются"""
+        found = self._lookup_by_name(
+            'rental_vehicles.vehicle.model', [row['model'] for _n, _k, row in parsed], 'manufacturer_id',
+        )
+        model_ids, to_create, rejected = {}, {}, set()
+        for row_number, _kind, row in parsed:
+            key = (name_key(row['manufacturer']), name_key(row['model']))
+            manufacturer_id = manufacturer_ids[key[0]]
+            if (manufacturer_id, key[1]) in found:
+                model_ids[key] = found[manufacturer_id, key[1]]
+                continue
+            if key in to_create:
+                continue
+            if not row.get('vehicle_type'):
+                errors.append((row_number, f"Vehicle type is required for new model {row['model']}"))
+                rejected.add(row_number)
+                continue
+            try:
+                specs = {
+                    field_name: cast(row[field_name])
+                    for field_name, cast in MODEL_SPEC_FIELDS.items()
+                    if row.get(field_name)
+                }
+            except ValueError:
+                errors.append((row_number, f"Invalid specifications for model {row['model']}"))
+                rejected.add(row_number)
+                continue
+            to_create[key] = {
+                'name': row['model'].strip(),
+                'manufacturer_id': manufacturer_id,
+                'vehicle_type_id': type_ids[name_key(row['vehicle_type'])],
+                **specs,
+            }
+        if to_create:
+            created = self.env['rental_vehicles.vehicle.model'].create(list(to_create.values()))
+            model_ids.update(zip(to_create, created.ids))
+            counts['models'] = len(created)
+
+        kept = []
+        for row_number, kind, row in parsed:
+            key = (name_key(row['manufacturer']), name_key(row['model']))
+            if row_number in rejected:
+                continue
+            if key not in model_ids:
+                errors.append((row_number, f"Model {row['model']} could not be created"))
+                continue
+            kept.append((row_number, kind, row))
+        return model_ids, kept
+
+    def _existing_keys(self, model, field_names, key, domain):
+        """Ключи уже существующих записей одним search_fetch"""
+        return {key(rec) for rec in model.with_context(active_test=False).search_fetch(domain, field_names)}
+
+    def _drop_duplicates(self, items, key, existing, message, errors):
+        """Отбрасывает строки с ключом из базы или повтором внутри файла"""
+        seen = set(existing)
+        kept = []
+        for row_number, vals in items:
+            item_key = key(vals)
+            if item_key in seen:
+                errors.append((row_number, message.format(item_key)))
+                continue
+            seen.add(item_key)
+            kept.append((row_number, vals))
+        return kept
+
+    def _parse_number(self, row, column, cast=int, required=False):
+        value = row.get(column)
+        if not value:
+            if required:
+                raise RowError(f"Column {column} is required")
+            return 0
+        try:
+            return cast(value)
+        except ValueError:
+            raise RowError(f"Invalid value '{value}' in column {column}")
+
+    def _vehicle_vals(self, row, model_id, office):
+        if not row.get('plate_number'):
+            raise RowError("Column plate_number is required")
+        return {
+            'plate_number': row['plate_number'].strip(),
+            'model_id': model_id,
+            'office_id': office.id,
+            'year': row.get('year') or False,
+            'mileage': self._parse_number(row, 'mileage'),
+            'purchase_price': self._parse_number(row, 'purchase_price'),
+        }
+
+    def _tariff_vals(self, row, model_id, office):
+        period_type = name_key(row.get('period_type')) or 'day'
+        if period_type not in TARIFF_PERIOD_TYPES:
+            raise RowError(f"Unknown period type '{row.get('period_type')}'")
+        return {
+            'office_id': office.id,
+            'vehicle_model_id': model_id,
+            'period_type': period_type,
+            'min_period': self._parse_number(row, 'min_period', required=True),
+            'price_per_unit': self._parse_number(row, 'price', float, required=True),
+            'currency_id': office.currency_id.id,
+        }
+
+    def _plan_vals(self, row, model_id, service_type_ids):
+        service_type_id = service_type_ids.get(name_key(row.get('service_type')))
+        if not service_type_id:
+            raise RowError(f"Unknown service type '{row.get('service_type')}'")
+        interval_km = self._parse_number(row, 'interval_km')
+        interval_days = self._parse_number(row, 'interval_days')
+        if not (interval_km or interval_days):
+            raise RowError("Maintenance plan needs interval_km or interval_days")
+        return {
+            'model_id': model_id,
+            'service_type_id': service_type_id,
+            'interval_km': interval_km,
+            'interval_days': interval_days,
+        }
+
+    @api.model
+    def _error_report(self, errors):
+        """CSV с ошибками по строкам"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('row', 'error'))
+        writer.writerows(errors)
+        return buffer.getvalue().encode()
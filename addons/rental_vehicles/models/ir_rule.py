@@ -0,0 +1,15 @@
+from odoo import models, api
+
+
+class IrRule(models.Model):
+    _inherit = 'ir.rule'
+
+    @api.model
+    def _eval_context(self):
+        """office_id / office_ids для domain_force правил по офисам - из кэша пользователя, без чтения res.users"""
+        scope = self.env['res.users']._get_office_scope()
+        return {
+            **super()._eval_context(),
+            'office_id': scope['office_id'],
+            'office_ids': list(scope['office_ids']),
+        }
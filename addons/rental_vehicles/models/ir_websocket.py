@@ -0,0 +1,18 @@
+from odoo import models
+
+from .fleet_dashboard import fleet_channel_office
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        """Каналы офисов дашборда парка - только для офисов, видимых пользователю по правилам доступа"""
+        requested = {fleet_channel_office(channel) for channel in channels} - {None}
+        if requested:
+            allowed = set(self.env['rental_vehicles.office'].search([('id', 'in', list(requested))]).ids)
+            channels = [
+                channel for channel in channels
+                if fleet_channel_office(channel) in (None, *allowed)
+            ]
+        return super()._build_bus_channel_list(channels)
@@ -1,7 +1,14 @@
+from contextlib import contextmanager
+
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
 
 
+# поля, меняющие расходы на ТО в журнале выручки
+MAINTENANCE_LEDGER_FIELDS = {'vehicle_id', 'date', 'maintenance_line_ids'}
+MAINTENANCE_LEDGER_LINE_FIELDS = {'maintenance_id', 'cost'}
+
+
 class RentalMaintenance(models.Model):
     _name = "rental_vehicles.maintenance"
     _description = "Maintenance"
@@ -45,6 +52,57 @@ class RentalMaintenance(models.Model):
         if self.vehicle_id:
             self.mileage = self.vehicle_id.mileage
 
+    def _ledger_contributions(self):
+        """Ключи журнала выручки (rental_vehicles.revenue.ledger): расходы на ТО со знаком минус"""
+        return {
+            (
+                rec.id, rec.date, rec.vehicle_id.office_id.id, rec.vehicle_id.id,
+                rec.vehicle_id.model_id.id, rec.vehicle_id.vehicle_type_id.id, 'maintenance',
+            ): -rec.total_cost
+            for rec in self.exists()
+            if rec.total_cost
+        }
+
+    @contextmanager
+    def _track_ledger(self, enabled=True):
+        """Разница расходов до/после операции уходит в журнал; вложенные операции не считаются повторно"""
+        if not enabled or self.env.context.get('maintenance_ledger_tracked'):
+            yield self
+            return
+        before = self._ledger_contributions()
+        yield self.with_context(maintenance_ledger_tracked=True)
+        self.env['rental_vehicles.revenue.ledger']._post_deltas(
+            self._name, before, self._ledger_contributions()
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(
+            RentalMaintenance,
+            self.with_context(maintenance_ledger_tracked=True),
+        ).create(vals_list).with_env(self.env)
+        self.env['rental_vehicles.maintenance.due']._refresh(records.vehicle_id.ids)
+        if not self.env.context.get('maintenance_ledger_tracked'):
+            self.env['rental_vehicles.revenue.ledger']._post_deltas(
+                self._name, {}, records._ledger_contributions()
+            )
+        return records
+
+    def write(self, vals):
+        vehicle_ids = self.vehicle_id.ids
+        with self._track_ledger(bool(MAINTENANCE_LEDGER_FIELDS & vals.keys())) as records:
+            res = super(RentalMaintenance, records).write(vals)
+        if {'vehicle_id', 'date', 'mileage', 'maintenance_line_ids'} & vals.keys():
+            self.env['rental_vehicles.maintenance.due']._refresh(vehicle_ids + self.vehicle_id.ids)
+        return res
+
+    def unlink(self):
+        vehicle_ids = self.vehicle_id.ids
+        with self._track_ledger() as records:
+            res = super(RentalMaintenance, records).unlink()
+        self.env['rental_vehicles.maintenance.due']._refresh(vehicle_ids)
+        return res
+
 
 class RentalMaintenanceLine(models.Model):
     _name = "rental_vehicles.maintenance.line"
@@ -59,3 +117,35 @@ class RentalMaintenanceLine(models.Model):
         for rec in self:
             if rec.service_type_id and not rec.cost:
                 rec.cost = rec.service_type_id.default_cost
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        maintenances = self.env['rental_vehicles.maintenance'].browse(
+            {vals['maintenance_id'] for vals in vals_list if vals.get('maintenance_id')}
+        )
+        with maintenances._track_ledger() as maintenances:
+            lines = super(RentalMaintenanceLine, self.with_env(maintenances.env)).create(vals_list)
+        lines = lines.with_env(self.env)
+        self.env['rental_vehicles.maintenance.due']._refresh(lines.maintenance_id.vehicle_id.ids)
+        return lines
+
+    def write(self, vals):
+        vehicle_ids = self.maintenance_id.vehicle_id.ids
+        maintenances = self.maintenance_id
+        if vals.get('maintenance_id'):
+            maintenances |= maintenances.browse(vals['maintenance_id'])
+        track = bool(MAINTENANCE_LEDGER_LINE_FIELDS & vals.keys())
+        with maintenances._track_ledger(track) as maintenances:
+            res = super(RentalMaintenanceLine, self.with_env(maintenances.env)).write(vals)
+        if {'maintenance_id', 'service_type_id'} & vals.keys():
+            self.env['rental_vehicles.maintenance.due']._refresh(
+                vehicle_ids + self.maintenance_id.vehicle_id.ids
+            )
+        return res
+
+    def unlink(self):
+        vehicle_ids = self.maintenance_id.vehicle_id.ids
+        with self.maintenance_id._track_ledger() as maintenances:
+            res = super(RentalMaintenanceLine, self.with_env(maintenances.env)).unlink()
+        self.env['rental_vehicles.maintenance.due']._refresh(vehicle_ids)
+        return res
@@ -1,4 +1,26 @@
 from odoo import models, fields, api, tools
+from odoo.tools import SQL
+
+from .perf_monitor import instrumented
+
+
+DUE_COLUMNS = (
+    "id, vehicle_id, office_id, model_id, service_type_id, "
+    "last_service_date, last_service_mileage, current_mileage, "
+    "next_service_date, next_service_mileage, km_to_due, days_to_due, "
+    "is_due, overdue, color"
+)
+
+# поля-источники графика ТО, которые нужно сбросить в БД перед пересчётом
+DUE_SOURCE_FIELDS = {
+    "rental_vehicles.vehicle": ["office_id", "model_id", "mileage"],
+    "rental_vehicles.maintenance": ["vehicle_id", "date", "mileage"],
+    "rental_vehicles.maintenance.line": ["maintenance_id", "service_type_id"],
+    "rental_vehicles.maintenance.plan": [
+        "model_id", "service_type_id", "interval_km", "interval_days",
+        "remind_before_km", "remind_before_days",
+    ],
+}
 
 
 class MaintenanceDueView(models.Model):
@@ -46,10 +68,14 @@ class MaintenanceDueView(models.Model):
             "target": "current",
         }
 
-    def init(self):
-        tools.drop_view_if_exists(self.env.cr, "rental_vehicles_maintenance_due")
-        self.env.cr.execute("""
-            CREATE VIEW rental_vehicles_maintenance_due AS
+    def _select_due_rows(self, vehicle_ids=None):
+        """SELECT строк графика ТО, при vehicle_ids - только по этим машинам"""
+        log_filter = vehicle_filter = SQL()
+        if vehicle_ids is not None:
+            log_filter = SQL("WHERE l.vehicle_id IN %s", vehicle_ids)
+            vehicle_filter = SQL("WHERE v.id IN %s", vehicle_ids)
+
+        return SQL("""
             WITH
             last_log AS (
                 SELECT DISTINCT ON (l.vehicle_id, cl.service_type_id)
@@ -60,6 +86,7 @@ class MaintenanceDueView(models.Model):
                     cl.id
                 FROM rental_vehicles_maintenance_line cl
                 JOIN rental_vehicles_maintenance l ON l.id = cl.maintenance_id
+                %(log_filter)s
                 ORDER BY l.vehicle_id, cl.service_type_id, l.date DESC, cl.id DESC
             ),
 
@@ -119,6 +146,7 @@ class MaintenanceDueView(models.Model):
                 LEFT JOIN last_log ll
                     ON ll.vehicle_id = v.id
                     AND ll.service_type_id = mst.service_type_id
+                %(vehicle_filter)s
             )
 
             SELECT
@@ -160,5 +188,89 @@ class MaintenanceDueView(models.Model):
                     ELSE 0
                 END AS color
 
-            FROM calc;
+            FROM calc
+        """, log_filter=log_filter, vehicle_filter=vehicle_filter)
+
+    # Таблица пересобирается по машинам при изменении журнала ТО, планов и пробега,
+    # плюс ночной полный пересчёт по крону (days_to_due зависит от текущей даты)
+    @api.model
+    @instrumented
+    def _refresh(self, vehicle_ids=None):
+        """Пересобирает строки таблицы для указанных машин (None - для всех)"""
+        if vehicle_ids is not None:
+            vehicle_ids = tuple(set(vehicle_ids))
+            if not vehicle_ids:
+                return
+
+        for model_name, fnames in DUE_SOURCE_FIELDS.items():
+            self.env[model_name].flush_model(fnames)
+
+        if vehicle_ids is None:
+            self.env.cr.execute("DELETE FROM rental_vehicles_maintenance_due")
+        else:
+            self.env.cr.execute(SQL(
+                "DELETE FROM rental_vehicles_maintenance_due WHERE vehicle_id IN %s",
+                vehicle_ids,
+            ))
+
+        # refresh_id - версия строк, по ней Vehicle кэширует maintenance_due_summary
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO rental_vehicles_maintenance_due ({columns}, refresh_id)
+            SELECT {columns}, %s FROM (%s) AS due
+            """.format(columns=DUE_COLUMNS),
+            SQL("nextval('rental_vehicles_maintenance_due_refresh_seq')"),
+            self._select_due_rows(vehicle_ids),
+        ))
+        self.invalidate_model()
+
+        # счётчик ТО на дашборде парка
+        if vehicle_ids is None:
+            office_ids = self.env['rental_vehicles.office'].sudo().search([]).ids
+        else:
+            office_ids = self.env['rental_vehicles.vehicle'].browse(vehicle_ids).office_id.ids
+        self.env['rental_vehicles.fleet.dashboard']._notify_offices(office_ids)
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute(
+            "SELECT relkind FROM pg_class WHERE relname = 'rental_vehicles_maintenance_due'"
+        )
+        row = cr.fetchone()
+        if row and row[0] == 'v':
+            tools.drop_view_if_exists(cr, "rental_vehicles_maintenance_due")
+
+        cr.execute("""
+            CREATE TABLE IF NOT EXISTS rental_vehicles_maintenance_due (
+                id BIGINT PRIMARY KEY,
+                vehicle_id INTEGER NOT NULL
+                    REFERENCES rental_vehicles_vehicle (id) ON DELETE CASCADE,
+                office_id INTEGER,
+                model_id INTEGER,
+                service_type_id INTEGER,
+                last_service_date DATE,
+                last_service_mileage INTEGER,
+                current_mileage INTEGER,
+                next_service_date DATE,
+                next_service_mileage INTEGER,
+                km_to_due INTEGER,
+                days_to_due INTEGER,
+                is_due BOOLEAN,
+                overdue BOOLEAN,
+                color INTEGER
+            )
+        """)
+        cr.execute("""
+            CREATE SEQUENCE IF NOT EXISTS rental_vehicles_maintenance_due_refresh_seq;
+            ALTER TABLE rental_vehicles_maintenance_due
+                ADD COLUMN IF NOT EXISTS refresh_id BIGINT;
+        """)
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS rental_vehicles_maintenance_due_vehicle_id_index
+                ON rental_vehicles_maintenance_due (vehicle_id);
+            CREATE INDEX IF NOT EXISTS rental_vehicles_maintenance_due_office_id_index
+                ON rental_vehicles_maintenance_due (office_id);
+            CREATE INDEX IF NOT EXISTS rental_vehicles_maintenance_due_is_due_index
+                ON rental_vehicles_maintenance_due (is_due);
         """)
+        self._refresh()
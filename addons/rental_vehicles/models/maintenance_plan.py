@@ -1,4 +1,4 @@
-from odoo import models, fields
+from odoo import models, fields, api
 
 
 class MaintenancePlan(models.Model):
@@ -21,3 +21,26 @@ class MaintenancePlan(models.Model):
         default=7,
         help="За сколько дней до наступления интервала подсвечивать"
     )
+
+    def _refresh_maintenance_due(self, model_ids):
+        # таблица графика ТО общая для всех офисов - пересчитываем все машины модели, не только видимые
+        vehicles = self.env['rental_vehicles.vehicle'].sudo().search([('model_id', 'in', model_ids)])
+        self.env['rental_vehicles.maintenance.due']._refresh(vehicles.ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        plans = super().create(vals_list)
+        self._refresh_maintenance_due(plans.model_id.ids)
+        return plans
+
+    def write(self, vals):
+        model_ids = self.model_id.ids
+        res = super().write(vals)
+        self._refresh_maintenance_due(model_ids + self.model_id.ids)
+        return res
+
+    def unlink(self):
+        model_ids = self.model_id.ids
+        res = super().unlink()
+        self._refresh_maintenance_due(model_ids)
+        return res
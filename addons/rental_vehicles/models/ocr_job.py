@@ -0,0 +1,126 @@
+import base64
+import threading
+from logging import getLogger
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.image import image_process
+
+
+_logger = getLogger(__name__)
+
+OCR_URL_PARAM = 'rental_vehicles.ocr_url'
+OCR_DEFAULT_URL = 'http://rental_ocr:8000/ocr/extract'
+OCR_TIMEOUT = (5, 60)  # connect, read
+OCR_MAX_ATTEMPTS = 3
+OCR_IMAGE_SIZE = (1600, 1600)
+OCR_IMAGE_QUALITY = 85
+# уведомление автору задачи (партнёру create_uid) о готовности, виджет мастера фото забирает результат сам
+OCR_JOB_NOTIFICATION = 'rental_vehicles.ocr_job_state'
+
+_ocr_local = threading.local()
+
+
+def ocr_session():
+    """requests.Session на поток: keep-alive пул соединений и повторы на 5xx/обрывах"""
+    session = getattr(_ocr_local, 'session', None)
+    if session is None:
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'POST'}),
+        )
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(max_retries=retry, pool_maxsize=4))
+        session.mount('https://', HTTPAdapter(max_retries=retry, pool_maxsize=4))
+        _ocr_local.session = session
+    return session
+
+
+class OcrJob(models.TransientModel):
+    _name = "rental_vehicles.ocr.job"
+    _description = "OCR Job"
+    _transient_max_hours = 6
+
+    state = fields.Selection([
+        ("pending", "Pending"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ], default="pending", required=True, index=True)
+    image = fields.Binary("Image", attachment=True, required=True)
+    result = fields.Json()
+    error = fields.Char()
+    attempts = fields.Integer(default=0)
+
+    @api.model
+    def _prepare_image(self, image):
+        """Уменьшаем и пережимаем фото с телефона перед отправкой в OCR"""
+        processed = image_process(
+            base64.b64decode(image),
+            size=OCR_IMAGE_SIZE,
+            quality=OCR_IMAGE_QUALITY,
+            output_format='JPEG',
+        )
+        return base64.b64encode(processed)
+
+    @api.model
+    def _enqueue(self, image):
+        job = self.create({"image": self._prepare_image(image)})
+        self.env.ref("rental_vehicles.ir_cron_process_ocr_jobs")._trigger()
+        return job
+
+    def _run(self):
+        self.ensure_one()
+        url = self.env['ir.config_parameter'].sudo().get_param(OCR_URL_PARAM, OCR_DEFAULT_URL)
+        try:
+            response = ocr_session().post(
+                url,
+                files={"file": ("photo.jpg", base64.b64decode(self.image))},
+                timeout=OCR_TIMEOUT,
+            )
+            response.raise_for_status()
+            self.write({"state": "done", "result": response.json(), "error": False})
+        except (requests.RequestException, ValueError) as e:
+            attempts = self.attempts + 1
+            _logger.warning("OCR job %s failed (attempt %s): %s", self.id, attempts, e)
+            self.write({
+                "attempts": attempts,
+                "error": str(e),
+                "state": "failed" if attempts >= OCR_MAX_ATTEMPTS else "pending",
+            })
+        if self.state != "pending":
+            self.env['bus.bus']._sendone(self.create_uid.partner_id, OCR_JOB_NOTIFICATION, {
+                "job_id": self.id,
+                "state": self.state,
+            })
+
+    @api.model
+    def _cron_process(self, limit=20):
+        """Разбирает очередь по одной задаче с коммитом, параллельные кроны не берут одну задачу"""
+        processed = [0]
+        for _index in range(limit):
+            self.env.cr.execute(SQL(
+                """
+                SELECT id
+                  FROM rental_vehicles_ocr_job
+                 WHERE state = 'pending'
+                   AND id NOT IN %s
+              ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+                """,
+                tuple(processed),
+            ))
+            row = self.env.cr.fetchone()
+            if not row:
+                return
+            self.browse(row[0])._run()
+            self.env.cr.commit()
+            processed.append(row[0])
+
+        self.env.ref("rental_vehicles.ir_cron_process_ocr_jobs")._trigger()
@@ -44,9 +44,16 @@ class RentalOffice(models.Model):
         
         if not office.currency_id.active:
             office.currency_id.active = True
-        
+
+        self.env['rental_vehicles.fleet.dashboard']._notify_new_offices(office)
         return office
 
+    def unlink(self):
+        res = super().unlink()
+        # офисы пропадают из office_ids пользователей - кэш _get_office_scope и правил устарел
+        self.env.registry.clear_cache()
+        return res
+
 
 class OfficeMixin(models.AbstractModel):
     _name = "rental_vehicles.office.mixin"
@@ -1,10 +1,15 @@
+from collections import defaultdict
+from contextlib import contextmanager
 from logging import getLogger
 from pprint import pformat
 from datetime import timedelta
 from typing import Literal
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
-from odoo.tools import format_datetime
+from odoo.tools import SQL
+
+from .fleet_dashboard import FLEET_OVERDUE_ORDER_FIELDS
+from .perf_monitor import instrumented
 
 
 _logger = getLogger(__name__)
@@ -24,6 +29,18 @@ SALARY_LINE_TYPES = {'tariff', 'accessory', 'manual', 'discount'}
 
 assert not (SALARY_LINE_TYPES - ORDER_LINE_TYPES), f"Invalid SALARY_LINE_TYPES, should be {ORDER_LINE_TYPES}"
 
+# статусы заказа, которые держат технику за собой на интервале start_date..end_date
+BOOKING_STATUS_CODES = ('draft', 'active')
+# тот же список литералами для предиката EXCLUDE-ограничения _vehicle_booking_overlap
+BOOKING_STATUS_SQL = ", ".join(f"'{code}'" for code in BOOKING_STATUS_CODES)
+
+# поля, меняющие вклад завершённых заказов в агрегаты арендаторов и журнал выручки
+DONE_ORDER_FIELDS = {
+    'renter_id', 'status_id', 'active', 'order_line_ids', 'rental_days', 'rental_hours',
+    'vehicle_id', 'office_id',
+}
+DONE_ORDER_LINE_FIELDS = {'order_id', 'price', 'quantity', 'type', 'tariff_id'}
+
 ORDER_LINE_SEQUENCE = {
     "tariff": 10,
     "manual": 20,
@@ -49,9 +66,17 @@ class StatusBarOrder(models.Model):
         ("info", "Info"),
     ])
 
+    @api.model
+    @tools.ormcache()
+    def _get_status_ids_by_code(self):
+        """code -> id всех статусов; при дублях кода побеждает первый по sequence"""
+        status_ids = {}
+        for status in self.sudo().search_fetch([], ['code']):
+            status_ids.setdefault(status.code, status.id)
+        return tools.frozendict(status_ids)
+
     def _search_by_code(self, code: str):
-        rec = self.search([('code', '=', code)], limit=1)
-        return rec
+        return self.browse(self._get_status_ids_by_code().get(code) or [])
 
     @property
     def _active_status(self):
@@ -73,11 +98,20 @@ class StatusBarOrder(models.Model):
     def create(self, vals):
         vals = self._prepare_code(vals)
         rec = super(StatusBarOrder, self).create(vals)
+        self.env.registry.clear_cache()
         return rec
 
     def write(self, vals):
         vals = self._prepare_code(vals)
-        return super(StatusBarOrder, self).write(vals)
+        res = super(StatusBarOrder, self).write(vals)
+        if {'code', 'sequence'} & vals.keys():
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
 
 
 class RentalVehiclesOrder(models.Model):
@@ -86,12 +120,23 @@ class RentalVehiclesOrder(models.Model):
     _description = "Rental Vehicles Order"
     _order = "start_date desc"
 
+    # booking_range - генерируемая колонка (см. init), GiST-индекс даёт сам EXCLUDE
+    _vehicle_booking_overlap = models.Constraint(
+        f"""EXCLUDE USING gist (vehicle_id WITH =, booking_range WITH &&)
+           WHERE (active AND vehicle_id IS NOT NULL AND status_code IN ({BOOKING_STATUS_SQL}))""",
+        'The vehicle is already booked for this period!'
+    )
+
     name = fields.Char(compute='_compute_name', store=True)
     active = fields.Boolean(default=True)
     vehicle_id = fields.Many2one(
         "rental_vehicles.vehicle",
         # required=True,
-        domain="[('office_id', '=', office_id), ('status', '=', 'available')]"
+        domain="[('id', 'in', available_vehicle_ids)]"
+    )
+    available_vehicle_ids = fields.Many2many(
+        "rental_vehicles.vehicle",
+        compute="_compute_available_vehicle_ids",
     )
     renter_id = fields.Many2one('rental_vehicles.renter')
     rental_days = fields.Integer(required=True, default=1)
@@ -106,10 +151,7 @@ class RentalVehiclesOrder(models.Model):
     status_id = fields.Many2one(
         "rental_vehicles.order.status",
         "Status",
-        default=lambda self: self.env["rental_vehicles.order.status"].search(
-            [("code", "=ilike", "draft")],
-            limit=1
-        )
+        default=lambda self: self.env["rental_vehicles.order.status"]._search_by_code("draft")
     )
     status_decoration = fields.Selection(related="status_id.decoration")
     status_code = fields.Char(
@@ -129,16 +171,13 @@ class RentalVehiclesOrder(models.Model):
         readonly=True,
     )
 
-    progress_percent = fields.Integer(compute="_compute_progress", store=False)
-    progress_label = fields.Char(compute="_compute_progress", store=False)
-    progress_html = fields.Html(compute="_compute_progress_html", sanitize=False)
-
     order_line_ids = fields.One2many(
         "rental_vehicles.order.line",
         "order_id",
         string="Order Lines",
     )
 
+    @instrumented
     def _create_update_tariff_lines(self, period_type: Literal['hour', 'day']):
         self.ensure_one()
 
@@ -156,16 +195,19 @@ class RentalVehiclesOrder(models.Model):
             self.order_line_ids = self.order_line_ids - tariff_line
             return
 
-        tariff = self.env['rental_vehicles.tariff'].search([
-            ('vehicle_model_id', '=', self.vehicle_model_id.id),
-            ('period_type', '=', period_type),
-            ('min_period', '<=', self[f_name]),
-            ('office_id', '=', self.office_id.id)
-        ], order='min_period desc', limit=1)
-        
+        tariff = self.env['rental_vehicles.tariff']._resolve_tariff(
+            self.office_id.id,
+            self.vehicle_model_id.id,
+            period_type,
+            self[f_name],
+        )
+
         if not tariff:
             return
 
+        if tariff_line and tariff_line.tariff_id.id == tariff.id:
+            return
+
         values = {
             'tariff_id': tariff.id,
             'name': tariff.name,
@@ -173,8 +215,7 @@ class RentalVehiclesOrder(models.Model):
         }
 
         if tariff_line:
-            if tariff_line.tariff_id.id != tariff.id:
-                tariff_line.update(values)
+            tariff_line.update(values)
             return
 
         values = {
@@ -184,6 +225,45 @@ class RentalVehiclesOrder(models.Model):
         }
         self.order_line_ids.new({**values})
 
+    def init(self):
+        self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        self.env.cr.execute("""
+            ALTER TABLE rental_vehicles_order
+            ADD COLUMN IF NOT EXISTS booking_range tsrange
+            GENERATED ALWAYS AS (
+                tsrange(start_date, GREATEST(start_date, end_date), '[)')
+            ) STORED
+        """)
+
+    @api.depends('office_id', 'start_date', 'end_date')
+    @instrumented
+    def _compute_available_vehicle_ids(self):
+        """Один _search_available на группу (офис, начало, конец), а не на запись.
+
+        Запрос исключает брони всей группы; машины, занятые другими заказами группы
+        (интервал у них тот же, значит пересекается), вычитаются для каждой записи.
+        """
+        vehicle_model = self.env['rental_vehicles.vehicle']
+        groups = defaultdict(lambda: self.browse())
+        for rec in self:
+            if rec.office_id and rec.start_date and rec.end_date:
+                groups[rec.office_id, rec.start_date, rec.end_date] |= rec
+            else:
+                rec.available_vehicle_ids = vehicle_model
+
+        for (office, start, end), records in groups.items():
+            available = vehicle_model._search_available(office, start, end, exclude_orders=records._origin)
+            booked = {
+                order.id: order.vehicle_id
+                for order in records._origin
+                if order.active and order.status_code in BOOKING_STATUS_CODES
+            }
+            for rec in records:
+                taken_by_others = vehicle_model.union(*(
+                    vehicle for order_id, vehicle in booked.items() if order_id != rec._origin.id
+                ))
+                rec.available_vehicle_ids = (available - taken_by_others) | rec.vehicle_id
+
     @api.onchange('vehicle_id')
     def _onchange_vehicle_id(self):
         self.start_mileage = False
@@ -217,6 +297,7 @@ class RentalVehiclesOrder(models.Model):
         'order_line_ids.total',
         'order_line_ids.type'
     )
+    @instrumented
     def _compute_amount(self):
         for rec in self:
             rec.amount_total = sum(rec.order_line_ids.mapped('total'))
@@ -227,35 +308,43 @@ class RentalVehiclesOrder(models.Model):
                 if line.affects_salary
             )
 
+    @instrumented
     def action_start_rental(self):
-        for rec in self:
-            if rec.status_code != "draft":
-                raise ValidationError("должен быть статус draft")
-        active = self.status_id._active_status
-        self.status_id = active.id
-        if self.vehicle_id:
-            self.vehicle_id.status = "rented"
+        if any(rec.status_code != "draft" for rec in self):
+            raise ValidationError("должен быть статус draft")
+        statuses = self.env["rental_vehicles.order.status"]
+        self.write({"status_id": statuses._active_status.id})
+        self._history_vehicles().write({"status": "rented"})
 
+    @instrumented
     def action_end_rental(self):
-        for rec in self:
-            if rec.status_code != "active":
-                raise ValidationError("Завершить можно только активную аренду.")
-        done = self.status_id._done_status
-        self.status_id = done.id
-        if self.vehicle_id:
-            self.vehicle_id.mileage = max(
-                self.vehicle_id.mileage, self.end_mileage
-            )
-            self.vehicle_id.status = "available"
+        if any(rec.status_code != "active" for rec in self):
+            raise ValidationError("Завершить можно только активную аренду.")
+        statuses = self.env["rental_vehicles.order.status"]
+        self.write({"status_id": statuses._done_status.id})
+
+        end_mileage = {}
+        for rec in self.filtered("vehicle_id"):
+            vehicle_id = rec.vehicle_id.id
+            end_mileage[vehicle_id] = max(end_mileage.get(vehicle_id, 0), rec.end_mileage)
+
+        vehicles = self._history_vehicles()
+        vehicles._raise_mileage(end_mileage)
+        vehicles.write({"status": "available"})
 
+    @instrumented
     def action_cancel(self):
-        for rec in self:
-            if rec.status_code not in ("draft", "active"):
-                raise ValidationError("Отменить можно только черновик или активную аренду.")
-            if rec.status_code == "active" and self.vehicle_id:
-                rec.vehicle_id.status = "available"
-            cancelled = self.status_id._cancelled_status
-            rec.status_id = cancelled.id
+        if any(rec.status_code not in ("draft", "active") for rec in self):
+            raise ValidationError("Отменить можно только черновик или активную аренду.")
+        released = self.filtered(lambda r: r.status_code == "active")._history_vehicles()
+        statuses = self.env["rental_vehicles.order.status"]
+        self.write({"status_id": statuses._cancelled_status.id})
+        released.write({"status": "available"})
+
+    def _history_vehicles(self):
+        """Машины заказов с привязкой vehicle -> order для истории статусов"""
+        order_ids = {rec.vehicle_id.id: rec.id for rec in self if rec.vehicle_id}
+        return self.vehicle_id.with_context(status_history_order_ids=order_ids)
 
     def action_open_photo_wizard(self):
         self.ensure_one()
@@ -286,15 +375,105 @@ class RentalVehiclesOrder(models.Model):
             placeholder = ' '.join(['%s'] * len(values))
             rec.name = placeholder % tuple(values) if values else False
 
+    def _renter_contributions(self):
+        """renter_id -> [кол-во, сумма] завершённых заказов из self"""
+        contributions = defaultdict(lambda: [0, 0.0])
+        for rec in self.exists():
+            if rec.active and rec.renter_id and rec.status_code == "done":
+                contribution = contributions[rec.renter_id.id]
+                contribution[0] += 1
+                contribution[1] += rec.amount_total
+        return contributions
+
+    def _ledger_contributions(self):
+        """(order, office, vehicle, модель, тип, тип строки) -> выручка завершённых заказов из self"""
+        contributions = defaultdict(float)
+        for rec in self.exists():
+            if not (rec.active and rec.status_code == "done"):
+                continue
+            for line in rec.order_line_ids:
+                key = (
+                    rec.id, rec.office_id.id, rec.vehicle_id.id,
+                    rec.vehicle_model_id.id, rec.vehicle_type_id.id, line.type,
+                )
+                contributions[key] += line.total
+        return contributions
+
+    @contextmanager
+    def _track_done_orders(self, enabled=True):
+        """Снимок вклада заказов до и после операции, разница уходит в агрегаты арендаторов
+        и в журнал выручки (rental_vehicles.revenue.ledger).
+
+        Отдаёт self с флагом в контексте, чтобы вложенные операции не считали дельту повторно.
+        """
+        if not enabled or self.env.context.get('done_orders_tracked'):
+            yield self
+            return
+
+        before = self._renter_contributions()
+        ledger_before = self._ledger_contributions()
+        yield self.with_context(done_orders_tracked=True)
+        after = self._renter_contributions()
+        self.env['rental_vehicles.renter']._apply_aggregate_deltas(before, after)
+        self.env['rental_vehicles.revenue.ledger']._post_order_deltas(
+            ledger_before, self._ledger_contributions()
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = super(
+            RentalVehiclesOrder,
+            self.with_context(done_orders_tracked=True),
+        ).create(vals_list).with_env(self.env)
+
+        if not self.env.context.get('done_orders_tracked'):
+            self.env['rental_vehicles.renter']._apply_aggregate_deltas(
+                {}, orders._renter_contributions()
+            )
+            self.env['rental_vehicles.revenue.ledger']._post_order_deltas(
+                {}, orders._ledger_contributions()
+            )
+        self.env['rental_vehicles.fleet.dashboard']._notify_offices(orders._active_vehicle_offices().ids)
+        return orders
+
+    def _active_vehicle_offices(self):
+        return self.filtered(lambda r: r.active and r.status_code == "active").vehicle_id.office_id
+
+    def unlink(self):
+        fleet_offices = self._active_vehicle_offices()
+        with self._track_done_orders() as orders:
+            res = super(RentalVehiclesOrder, orders).unlink()
+        self.env['rental_vehicles.fleet.dashboard']._notify_offices(fleet_offices.ids)
+        return res
+
     def write(self, vals):
-        old_vehicle_id = self.vehicle_id.id
-        res = super(RentalVehiclesOrder, self).write(vals)
+        track = bool(DONE_ORDER_FIELDS & vals.keys())
+        # счётчик просроченных аренд на дашборде: офисы машин активных заказов до и после записи
+        fleet_offices = None
+        if FLEET_OVERDUE_ORDER_FIELDS & vals.keys():
+            fleet_offices = self._active_vehicle_offices()
+        old_vehicles = {rec.id: rec.vehicle_id for rec in self} if 'vehicle_id' in vals else None
+        with self._track_done_orders(track) as orders:
+            res = super(RentalVehiclesOrder, orders).write(vals)
+
+        if fleet_offices is not None:
+            self.env['rental_vehicles.fleet.dashboard']._notify_offices(
+                (fleet_offices | self._active_vehicle_offices()).ids
+            )
+        if old_vehicles is None:
+            return res
 
-        if old_vehicle_id != self.vehicle_id.id and self.status_code == "active":
-            old_vehicle = self.env[self.vehicle_id._name].browse(old_vehicle_id)
-            old_vehicle.status = 'available'
-            self.vehicle_id.status = 'rented'
-            self._log([f'{v.name}: {v.status}' for v in (old_vehicle, self.vehicle_id)])
+        swapped = self.filtered(
+            lambda r: r.status_code == "active" and old_vehicles[r.id] != r.vehicle_id
+        )
+        if swapped:
+            released = self.env[self.vehicle_id._name].union(
+                *(old_vehicles[rec.id] for rec in swapped)
+            )
+            order_ids = {old_vehicles[rec.id].id: rec.id for rec in swapped}
+            released.with_context(status_history_order_ids=order_ids).status = 'available'
+            swapped._history_vehicles().status = 'rented'
+            self._log([f'{v.name}: {v.status}' for v in released | swapped.vehicle_id])
 
         return res
 
@@ -338,59 +517,6 @@ class RentalVehiclesOrder(models.Model):
 
         getattr(_logger, level)(final)
 
-    @api.depends("start_date", "end_date")
-    def _compute_progress(self):
-        now = fields.Datetime.now()
-        for rec in self:
-            if rec.start_date and rec.end_date:
-                total = (rec.end_date - rec.start_date).total_seconds()
-                passed = (now - rec.start_date).total_seconds()
-                rec.progress_percent = int(max(0, min(100, passed / total * 100)))
-            else:
-                rec.progress_percent = 0
-
-            if rec.end_date:
-                rec.progress_label = format_datetime(
-                    rec.env,
-                    rec.end_date,
-                    tz=rec.env.user.tz or "UTC",
-                    lang_code="ru_RU",
-                    dt_format="d MMM HH:mm"
-                )
-            else:
-                rec.progress_label = ""
-
-    @api.depends("progress_percent", "progress_label", 'end_date')
-    def _compute_progress_html(self):
-        now = fields.Datetime.now()
-        for rec in self:
-            color = "#adb5bd"
-
-            if rec.status_id == rec.status_id._active_status:
-                if rec.end_date:
-                    if rec.end_date < now:
-                        color = "#dc3545"  # красный (просрочено)
-                    elif (rec.end_date - now).total_seconds() < 6 * 3600:
-                        color = "#fd7e14"  # оранжевый (скоро заканчивается)
-                    else:
-                        color = "#2f80ed"  # синий (в норме)
-                else:
-                    color = "#2f80ed"
-
-            width = rec.progress_percent
-
-            rec.progress_html = f"""
-            <div style='width:100%; background:#e9ecef; height:14px; border-radius:4px; position:relative;'>
-                <div style='width:{width}%; background:{color}; height:100%; border-radius:4px;'></div>
-
-                <span style='position:absolute; left:50%; top:-2px; 
-                             transform:translateX(-50%);
-                             font-size:11px; color:#333; white-space:nowrap;'>
-                    {rec.progress_label}
-                </span>
-            </div>
-            """
-
     @api.onchange('order_line_ids')
     def _onchange_order_lines(self):
         lines = self.order_line_ids.filtered(
@@ -461,6 +587,7 @@ class OrderLine(models.Model):
         "order_id.rental_hours",
         "tariff_id.period_type",
     )
+    @instrumented
     def _compute_total(self):
         for rec in self:
             period = 1
@@ -497,8 +624,10 @@ class OrderLine(models.Model):
             )
 
     def unlink(self):
-        self._sync_rental_period()
-        return super().unlink()
+        with self.order_id._track_done_orders() as orders:
+            lines = self.with_env(orders.env)
+            lines._sync_rental_period()
+            return super(OrderLine, lines).unlink()
 
     def _sync_rental_period(self):
         for line in self.filtered(
@@ -515,16 +644,25 @@ class OrderLine(models.Model):
         ):
             if "price" in vals:
                 vals["price"] = -abs(vals["price"])
-        return super().write(vals)
+
+        orders = self.order_id
+        if vals.get("order_id"):
+            orders |= orders.browse(vals["order_id"])
+
+        track = bool(DONE_ORDER_LINE_FIELDS & vals.keys())
+        with orders._track_done_orders(track) as orders:
+            return super(OrderLine, self.with_env(orders.env)).write(vals)
 
     @api.model
     def create(self, vals):
-        if isinstance(vals, list):
-            for v in vals:
-                if v.get("type") == "discount" and "price" in v:
-                    v["price"] = -abs(v["price"])
-            return super().create(vals)
-
-        if vals.get("type") == "discount" and "price" in vals:
-            vals["price"] = -abs(vals["price"])
-        return super().create(vals)
+        vals_list = vals if isinstance(vals, list) else [vals]
+        for v in vals_list:
+            if v.get("type") == "discount" and "price" in v:
+                v["price"] = -abs(v["price"])
+
+        orders = self.env["rental_vehicles.order"].browse(
+            {v["order_id"] for v in vals_list if v.get("order_id")}
+        )
+        with orders._track_done_orders() as orders:
+            lines = super(OrderLine, self.with_env(orders.env)).create(vals)
+        return lines.with_env(self.env)
@@ -0,0 +1,226 @@
+import time
+from datetime import timedelta
+from logging import getLogger
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+from .order import ORDER_LINE_TYPE_SELECTION
+from .perf_monitor import instrumented
+
+
+_logger = getLogger(__name__)
+
+ARCHIVE_STATUS_CODES = ('done', 'cancelled')
+ARCHIVE_HORIZON_PARAM = 'rental_vehicles.order_archive_days'
+ARCHIVE_HORIZON_DAYS = 730
+ARCHIVE_BATCH_SIZE = 500
+# сколько секунд крон переносит пачки, потом перезапускает себя
+ARCHIVE_TIME_BUDGET = 120
+
+# колонка архива -> колонка rental_vehicles_order
+ARCHIVE_ORDER_COLUMNS = {
+    'id': 'id',
+    'name': 'name',
+    'active': 'active',
+    'office_id': 'office_id',
+    'vehicle_id': 'vehicle_id',
+    'renter_id': 'renter_id',
+    'manager_id': 'create_uid',
+    'status_code': 'status_code',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'rental_days': 'rental_days',
+    'rental_hours': 'rental_hours',
+    'start_mileage': 'start_mileage',
+    'end_mileage': 'end_mileage',
+    'amount_total': 'amount_total',
+    'amount_salary_base': 'amount_salary_base',
+    'order_create_date': 'create_date',
+}
+ARCHIVE_LINE_COLUMNS = (
+    'id', 'order_id', 'name', 'sequence', 'type', 'accessory_id', 'tariff_id',
+    'quantity', 'price', 'total', 'affects_salary',
+)
+
+
+class OrderArchive(models.Model):
+    """Закрытые заказы старше горизонта, перенесённые из rental_vehicles.order (id сохраняется)"""
+    _name = "rental_vehicles.order.archive"
+    _description = "Archived Rental Order"
+    _order = "start_date desc, id desc"
+    _log_access = False
+
+    name = fields.Char(readonly=True)
+    active = fields.Boolean(readonly=True)
+    office_id = fields.Many2one("rental_vehicles.office", readonly=True, index=True)
+    vehicle_id = fields.Many2one("rental_vehicles.vehicle", readonly=True, index=True, ondelete="set null")
+    renter_id = fields.Many2one("rental_vehicles.renter", readonly=True, index=True, ondelete="set null")
+    manager_id = fields.Many2one("res.users", string="Manager", readonly=True, ondelete="set null")
+    status_code = fields.Char(readonly=True)
+    start_date = fields.Datetime(readonly=True, index=True)
+    end_date = fields.Datetime(readonly=True)
+    rental_days = fields.Integer(readonly=True)
+    rental_hours = fields.Integer(readonly=True)
+    start_mileage = fields.Integer(readonly=True)
+    end_mileage = fields.Integer(readonly=True)
+    currency_id = fields.Many2one(related='office_id.currency_id')
+    amount_total = fields.Monetary(readonly=True)
+    amount_salary_base = fields.Monetary(readonly=True)
+    order_create_date = fields.Datetime("Created On", readonly=True)
+    archive_date = fields.Datetime(readonly=True)
+    line_ids = fields.One2many("rental_vehicles.order.line.archive", "order_id", readonly=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        raise UserError("Orders are archived only by the archival job.")
+
+    def write(self, vals):
+        raise UserError("Archived orders are read-only.")
+
+    def unlink(self):
+        raise UserError("Archived orders are read-only.")
+
+    @api.model
+    def _get_cutoff(self):
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            ARCHIVE_HORIZON_PARAM, ARCHIVE_HORIZON_DAYS,
+        ))
+        return fields.Datetime.now() - timedelta(days=days)
+
+    @api.model
+    @instrumented
+    def _archive_batch(self, cutoff, limit=ARCHIVE_BATCH_SIZE):
+        """Переносит до limit закрытых заказов (со строками) старше cutoff; возвращает число перенесённых.
+
+        Заказы блокируются SKIP LOCKED, вставка идёт с ON CONFLICT DO NOTHING - пачку можно
+        безопасно повторить после обрыва.
+        """
+        Order = self.env['rental_vehicles.order']
+        Order.flush_model()
+        self.env['rental_vehicles.order.line'].flush_model()
+        self.env['rental_vehicles.payout'].flush_model(['order_ids', 'archived_order_ids'])
+        self.env['rental_vehicles.manager.payout'].flush_model(['order_ids', 'archived_order_ids'])
+
+        cr = self.env.cr
+        cr.execute(SQL(
+            """
+            SELECT id
+              FROM rental_vehicles_order
+             WHERE status_code IN %s
+               AND start_date < %s
+          ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+            """,
+            ARCHIVE_STATUS_CODES, cutoff, limit,
+        ))
+        order_ids = tuple(row[0] for row in cr.fetchall())
+        if not order_ids:
+            return 0
+
+        cr.execute(SQL(
+            """
+            INSERT INTO rental_vehicles_order_archive (%(columns)s, archive_date)
+            SELECT %(source)s, now() at time zone 'UTC'
+              FROM rental_vehicles_order
+             WHERE id IN %(order_ids)s
+                ON CONFLICT (id) DO NOTHING
+            """,
+            columns=SQL(", ").join(SQL.identifier(column) for column in ARCHIVE_ORDER_COLUMNS),
+            source=SQL(", ").join(SQL.identifier(column) for column in ARCHIVE_ORDER_COLUMNS.values()),
+            order_ids=order_ids,
+        ))
+        line_columns = SQL(", ").join(SQL.identifier(column) for column in ARCHIVE_LINE_COLUMNS)
+        cr.execute(SQL(
+            """
+            INSERT INTO rental_vehicles_order_line_archive (%(columns)s)
+            SELECT %(columns)s
+              FROM rental_vehicles_order_line
+             WHERE order_id IN %(order_ids)s
+                ON CONFLICT (id) DO NOTHING
+            """,
+            columns=line_columns,
+            order_ids=order_ids,
+        ))
+        # связи выплат с заказами переносятся на архив до удаления - иначе их снесёт каскад rel-таблиц
+        for model_name in ('rental_vehicles.payout', 'rental_vehicles.manager.payout'):
+            source = self.env[model_name]._fields['order_ids']
+            target = self.env[model_name]._fields['archived_order_ids']
+            cr.execute(SQL(
+                """
+                INSERT INTO %(target)s (%(target_owner)s, %(target_order)s)
+                SELECT %(source_owner)s, %(source_order)s
+                  FROM %(source)s
+                 WHERE %(source_order)s IN %(order_ids)s
+                    ON CONFLICT DO NOTHING
+                """,
+                target=SQL.identifier(target.relation),
+                target_owner=SQL.identifier(target.column1),
+                target_order=SQL.identifier(target.column2),
+                source=SQL.identifier(source.relation),
+                source_owner=SQL.identifier(source.column1),
+                source_order=SQL.identifier(source.column2),
+                order_ids=order_ids,
+            ))
+            self.env[model_name].invalidate_model(['order_ids', 'archived_order_ids'])
+
+        # удаление мимо ORM: агрегаты арендаторов и суммы выплат читают архив сами
+        cr.execute(SQL(
+            """
+            DELETE FROM rental_vehicles_order_line WHERE order_id IN %(order_ids)s;
+            DELETE FROM rental_vehicles_order WHERE id IN %(order_ids)s;
+            """,
+            order_ids=order_ids,
+        ))
+        Order.invalidate_model()
+        self.env['rental_vehicles.order.line'].invalidate_model()
+        self.invalidate_model()
+        return len(order_ids)
+
+    @api.model
+    def _cron_archive(self, limit=ARCHIVE_BATCH_SIZE, time_budget=ARCHIVE_TIME_BUDGET):
+        """Пачки с коммитом после каждой; при нехватке времени крон ставит себя в очередь снова"""
+        cutoff = self._get_cutoff()
+        deadline = time.monotonic() + time_budget
+        total = 0
+        while time.monotonic() < deadline:
+            moved = self._archive_batch(cutoff, limit)
+            if not moved:
+                _logger.info("Order archive: %s orders moved, nothing left before %s", total, cutoff)
+                return
+            self.env.cr.commit()
+            total += moved
+
+        _logger.info("Order archive: %s orders moved, continuing in the next run", total)
+        self.env.ref("rental_vehicles.ir_cron_archive_orders")._trigger()
+
+
+class OrderLineArchive(models.Model):
+    _name = "rental_vehicles.order.line.archive"
+    _description = "Archived Order Line"
+    _order = "sequence asc, id asc"
+    _log_access = False
+
+    order_id = fields.Many2one("rental_vehicles.order.archive", readonly=True, index=True, ondelete="cascade")
+    name = fields.Char(readonly=True)
+    sequence = fields.Integer(readonly=True)
+    type = fields.Selection(ORDER_LINE_TYPE_SELECTION, readonly=True)
+    accessory_id = fields.Many2one("rental_vehicles.accessory", readonly=True, ondelete="set null")
+    tariff_id = fields.Many2one("rental_vehicles.tariff", readonly=True, ondelete="set null")
+    quantity = fields.Float('qty', readonly=True)
+    currency_id = fields.Many2one(related="order_id.currency_id")
+    price = fields.Monetary(readonly=True)
+    total = fields.Monetary(readonly=True)
+    affects_salary = fields.Boolean(readonly=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        raise UserError("Order lines are archived only by the archival job.")
+
+    def write(self, vals):
+        raise UserError("Archived order lines are read-only.")
+
+    def unlink(self):
+        raise UserError("Archived order lines are read-only.")
@@ -1,4 +1,7 @@
 from odoo import models, fields, api
+from odoo.tools import SQL
+
+from .perf_monitor import instrumented
 
 
 class Payout(models.Model):
@@ -13,6 +16,8 @@ class Payout(models.Model):
     date_to = fields.Date("Date To", required=True)
 
     order_ids = fields.Many2many("rental_vehicles.order", string="Orders")
+    # заказы, перенесённые в архив: связи копирует OrderArchive._archive_batch
+    archived_order_ids = fields.Many2many("rental_vehicles.order.archive", string="Archived Orders", readonly=True)
     manager_payout_ids = fields.One2many('rental_vehicles.manager.payout', 'payout_id')
     currency_id = fields.Many2one(
         "res.currency",
@@ -23,7 +28,11 @@ class Payout(models.Model):
     salary_fixed_usd = fields.Float(related='office_id.salary_fixed_usd')
     
     currency_rate_snapshot = fields.Float(
-        string="Exchange Rate Snapshot (USD → Office Currency)"
+        string="Exchange Rate Snapshot (USD → Office Currency)",
+        compute="_compute_currency_rate_snapshot",
+        store=True,
+        readonly=False,
+        help="Taken from the local rate table on the period end date, can be corrected by hand.",
     )
     total_payout = fields.Monetary(
         string="Total Payout",
@@ -37,6 +46,15 @@ class Payout(models.Model):
         for rec in self:
             rec.total_payout = sum(rec.manager_payout_ids.mapped('total_payout'))
 
+    @api.depends('currency_id', 'date_to')
+    def _compute_currency_rate_snapshot(self):
+        """Курс фиксируется при смене валюты или конца периода; новые курсы в таблице его не меняют"""
+        rates = self.env['rental_vehicles.currency.rate']._get_rates([
+            (rec.currency_id.id, rec.date_to) for rec in self if rec.currency_id and rec.date_to
+        ])
+        for rec in self:
+            rec.currency_rate_snapshot = rates.get((rec.currency_id.id, rec.date_to)) or rec.currency_rate_snapshot
+
     @api.depends('office_id', 'date_from')
     def _compute_name(self):
         for rec in self:
@@ -45,26 +63,98 @@ class Payout(models.Model):
             else:
                 rec.name = rec.office_id.name
 
+    @instrumented
     def action_recalculate(self):
         for rec in self:
-            rec.write({'manager_payout_ids':[fields.Command.clear()]})
-
-            rec.order_ids = self.env[rec.order_ids._name].search([
-                ("office_id", "=", rec.office_id.id),
-                ("start_date", ">=", rec.date_from),
-                ("start_date", "<=", rec.date_to),
-                ("status_code", "not in", ["draft", 'cancelled']),
-            ])
-
-            values = []
-            order_grouped_list = rec.order_ids.grouped(key="create_uid")
-            for manager, orders in order_grouped_list.items():
-                m = rec.manager_payout_ids.create({
-                    'manager_id': manager.id,
-                    'order_ids': orders
-                })
-                values.append(m.id)
-            rec.manager_payout_ids = [(6, 0, values)]
+            rec._recalculate_manager_payouts()
+
+    def _aggregate_manager_revenue(self):
+        """[(create_uid, [order ids], [archived order ids], revenue, revenue_base)] одним GROUP BY.
+
+        Архивные заказы (rental_vehicles.order.archive) входят в суммы и отдельный список ids.
+        """
+        self.ensure_one()
+        self.env['rental_vehicles.order'].flush_model([
+            'office_id', 'start_date', 'status_code', 'active',
+            'amount_total', 'amount_salary_base',
+        ])
+        self.env.cr.execute(SQL(
+            """
+            SELECT create_uid,
+                   COALESCE(ARRAY_AGG(id ORDER BY id) FILTER (WHERE NOT archived), '{}'),
+                   COALESCE(ARRAY_AGG(id ORDER BY id) FILTER (WHERE archived), '{}'),
+                   COALESCE(SUM(amount_total), 0),
+                   COALESCE(SUM(amount_salary_base), 0)
+              FROM (
+                    SELECT id, create_uid, office_id, start_date, active, status_code,
+                           amount_total, amount_salary_base, FALSE AS archived
+                      FROM rental_vehicles_order
+                 UNION ALL
+                    SELECT id, manager_id, office_id, start_date, active, status_code,
+                           amount_total, amount_salary_base, TRUE
+                      FROM rental_vehicles_order_archive
+                   ) orders
+             WHERE office_id = %(office_id)s
+               AND start_date >= %(date_from)s
+               AND start_date < %(date_to)s::date + 1
+               AND active
+               AND (status_code IS NULL OR status_code NOT IN ('draft', 'cancelled'))
+          GROUP BY create_uid
+            """,
+            office_id=self.office_id.id,
+            date_from=self.date_from,
+            date_to=self.date_to,
+        ))
+        return self.env.cr.fetchall()
+
+    def _recalculate_manager_payouts(self):
+        """Пересчёт выплат менеджеров: трогаем только тех, у кого изменились заказы или суммы"""
+        self.ensure_one()
+        currency = self.currency_id
+        existing = {mp.manager_id.id: mp for mp in self.manager_payout_ids}
+
+        to_create = []
+        all_order_ids, all_archived_ids = [], []
+        for manager_id, order_ids, archived_ids, revenue, revenue_base in self._aggregate_manager_revenue():
+            all_order_ids += order_ids
+            all_archived_ids += archived_ids
+            manager_payout = existing.pop(manager_id, None)
+
+            if (
+                manager_payout
+                and sorted(manager_payout.order_ids.ids) == order_ids
+                and sorted(manager_payout.archived_order_ids.ids) == archived_ids
+                and not currency.compare_amounts(manager_payout.revenue, revenue)
+                and not currency.compare_amounts(manager_payout.revenue_base, revenue_base)
+            ):
+                continue
+
+            vals = {
+                'order_ids': [fields.Command.set(order_ids)],
+                'archived_order_ids': [fields.Command.set(archived_ids)],
+                'revenue': revenue,
+                'revenue_base': revenue_base,
+            }
+            if manager_payout:
+                manager_payout.write(vals)
+            else:
+                to_create.append({**vals, 'payout_id': self.id, 'manager_id': manager_id})
+
+        self.env['rental_vehicles.manager.payout'].create(to_create)
+        self.env['rental_vehicles.manager.payout'].union(*existing.values()).unlink()
+
+        if sorted(self.order_ids.ids) != sorted(all_order_ids):
+            self.order_ids = [fields.Command.set(all_order_ids)]
+        if sorted(self.archived_order_ids.ids) != sorted(all_archived_ids):
+            self.archived_order_ids = [fields.Command.set(all_archived_ids)]
+
+    def _consolidated_totals(self, currency):
+        """{payout id: total_payout в currency} по курсам на конец периода, одна конвертация на все выплаты"""
+        payouts = self.filtered('date_to')
+        amounts = self.env['rental_vehicles.currency.rate']._convert_rows(
+            [(payout.total_payout, payout.currency_id.id, payout.date_to) for payout in payouts], currency,
+        )
+        return dict(zip(payouts.ids, amounts))
 
     def action_view_orders(self):
         return {
@@ -76,6 +166,16 @@ class Payout(models.Model):
             "context": {},
         }
 
+    def action_view_archived_orders(self):
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Archived Orders",
+            "res_model": self['archived_order_ids']._name,  # noqa
+            "view_mode": "list,form",
+            "domain": [("id", "in", self.archived_order_ids.ids)],
+            "context": {},
+        }
+
 
 class ManagerPayout(models.Model):
     _name = "rental_vehicles.manager.payout"
@@ -84,21 +184,21 @@ class ManagerPayout(models.Model):
     payout_id = fields.Many2one("rental_vehicles.payout")
     manager_id = fields.Many2one("res.users", required=True, string="Manager")
     order_ids = fields.Many2many("rental_vehicles.order", string="Orders")
+    archived_order_ids = fields.Many2many("rental_vehicles.order.archive", string="Archived Orders", readonly=True)
     currency_id = fields.Many2one(
         "res.currency",
         related="payout_id.currency_id"
     )
+    # revenue / revenue_base пишет Payout._recalculate_manager_payouts из агрегата по заказам
     revenue = fields.Monetary(
         "Revenue",
         currency_field="currency_id",
-        compute='_compute_revenue',
-        store=True
+        readonly=True,
     )
     revenue_base = fields.Monetary(
         "Revenue Base",
         currency_field="currency_id",
-        compute='_compute_revenue',
-        store=True
+        readonly=True,
     )
     percent_part = fields.Monetary(
         "Percent Part",
@@ -120,13 +220,7 @@ class ManagerPayout(models.Model):
         store=True
     )
 
-    @api.depends('order_ids.amount_salary_base')
-    def _compute_revenue(self):
-        for rec in self:
-            rec.revenue = sum(rec.order_ids.mapped('amount_total'))
-            rec.revenue_base = sum(rec.order_ids.mapped('amount_salary_base'))
-
-    @api.depends('revenue', 'payout_id.salary_percent')
+    @api.depends('revenue_base', 'payout_id.salary_percent')
     def _compute_percent_part(self):
         for rec in self:
             rec.percent_part = rec.revenue_base  * (rec.payout_id.salary_percent / 100)
@@ -0,0 +1,97 @@
+import functools
+import threading
+import time
+from collections import deque
+from logging import getLogger
+
+from odoo import models, fields, api
+
+
+_logger = getLogger(__name__)
+
+# кольцевой буфер замеров, свой в каждом воркере
+PERF_SAMPLES = deque(maxlen=2000)
+
+PARAM_ENABLED = 'rental_vehicles.perf_monitor'
+PARAM_MAX_QUERIES = 'rental_vehicles.perf_threshold_queries'
+PARAM_MAX_MS = 'rental_vehicles.perf_threshold_ms'
+DEFAULT_MAX_QUERIES = 50
+DEFAULT_MAX_MS = 500
+
+
+def instrumented(method):
+    """Считает SQL-запросы, время SQL и время Python вызова метода модели.
+
+    Ставится ближе всех к def, под @api.depends / @api.onchange / @api.model.
+    """
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        if get_param(PARAM_ENABLED, 'True') in ('False', '0', ''):
+            return method(self, *args, **kwargs)
+
+        thread = threading.current_thread()
+        if not hasattr(thread, 'query_time'):
+            thread.query_count = 0
+            thread.query_time = 0
+
+        cr = self.env.cr
+        queries = cr.sql_log_count
+        sql_time = thread.query_time
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            total_ms = (time.perf_counter() - start) * 1000
+            sql_ms = (thread.query_time - sql_time) * 1000
+            sample = {
+                'timestamp': fields.Datetime.now(),
+                'method': name,
+                'records': len(self),
+                'queries': cr.sql_log_count - queries,
+                'sql_ms': round(sql_ms, 2),
+                'python_ms': round(max(total_ms - sql_ms, 0), 2),
+                'user_id': self.env.uid,
+            }
+            sample['slow'] = (
+                sample['queries'] > int(get_param(PARAM_MAX_QUERIES, DEFAULT_MAX_QUERIES))
+                or total_ms > float(get_param(PARAM_MAX_MS, DEFAULT_MAX_MS))
+            )
+            PERF_SAMPLES.append(sample)
+            if sample['slow']:
+                _logger.warning(
+                    "%s on %s records: %s queries, %.1f ms SQL, %.1f ms Python",
+                    name, sample['records'], sample['queries'], sample['sql_ms'], sample['python_ms'],
+                )
+
+    return wrapper
+
+
+class PerfSample(models.TransientModel):
+    _name = "rental_vehicles.perf.sample"
+    _description = "Performance Sample"
+    _order = "timestamp desc"
+
+    timestamp = fields.Datetime(readonly=True)
+    method = fields.Char(readonly=True)
+    records = fields.Integer(readonly=True)
+    queries = fields.Integer(readonly=True)
+    sql_ms = fields.Float("SQL (ms)", readonly=True)
+    python_ms = fields.Float("Python (ms)", readonly=True)
+    user_id = fields.Many2one("res.users", readonly=True)
+    slow = fields.Boolean(readonly=True)
+
+    @api.model
+    def action_load_samples(self):
+        """Снимок кольцевого буфера текущего воркера в список"""
+        self.search([]).unlink()
+        self.create(list(PERF_SAMPLES))
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Performance Samples",
+            "res_model": self._name,
+            "view_mode": "list,pivot",
+            "target": "current",
+        }
@@ -1,7 +1,20 @@
 from odoo import models, fields, api
 
-from datetime import timedelta
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+from .perf_monitor import instrumented
+
+
+# отменённые уроки не занимают инструктора
+LESSON_INACTIVE_STATES = ('cancelled',)
+# тот же список литералами для предиката EXCLUDE-ограничения _instructor_lesson_overlap
+LESSON_INACTIVE_SQL = ", ".join(f"'{state}'" for state in LESSON_INACTIVE_STATES)
+# поля, меняющие выручку проведённых уроков в журнале
+LESSON_LEDGER_FIELDS = {'state', 'office_id', 'start_datetime', 'duration_hours', 'price_per_hour'}
 
 
 class RentalTrainingLesson(models.Model):
@@ -9,6 +22,13 @@ class RentalTrainingLesson(models.Model):
     _description = "Moto Training Lesson"
     _inherit = ['rental_vehicles.office.mixin']
 
+    # lesson_range - генерируемая колонка (см. init), GiST-индекс даёт сам EXCLUDE
+    _instructor_lesson_overlap = models.Constraint(
+        f"""EXCLUDE USING gist (instructor_id WITH =, lesson_range WITH &&)
+           WHERE (instructor_id IS NOT NULL AND state NOT IN ({LESSON_INACTIVE_SQL}))""",
+        'The instructor already has a lesson at this time!'
+    )
+
     name = fields.Char(
         string="Subject",
         required=True,
@@ -43,6 +63,16 @@ class RentalTrainingLesson(models.Model):
 
     notes = fields.Text()
 
+    def init(self):
+        self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        self.env.cr.execute("""
+            ALTER TABLE rental_vehicles_training_lesson
+            ADD COLUMN IF NOT EXISTS lesson_range tsrange
+            GENERATED ALWAYS AS (
+                tsrange(start_datetime, GREATEST(start_datetime, end_datetime), '[)')
+            ) STORED
+        """)
+
     @api.depends("start_datetime", "duration_hours")
     def _compute_end_datetime(self):
         for rec in self:
@@ -89,7 +119,125 @@ class RentalTrainingLesson(models.Model):
                 start_dt = self._round_to_next_hour(vals["start_datetime"])
                 vals["start_datetime"] = start_dt
 
-        return super().create(vals_list)
+        lessons = super().create(vals_list)
+        self.env['rental_vehicles.revenue.ledger']._post_deltas(
+            self._name, {}, lessons._ledger_contributions()
+        )
+        return lessons
+
+    def write(self, vals):
+        with self._track_ledger(bool(LESSON_LEDGER_FIELDS & vals.keys())):
+            return super().write(vals)
+
+    def unlink(self):
+        with self._track_ledger():
+            return super().unlink()
+
+    def _ledger_contributions(self):
+        """Ключи журнала выручки (rental_vehicles.revenue.ledger) проведённых уроков"""
+        return {
+            (rec.id, rec.start_datetime.date(), rec.office_id.id, False, False, False, 'lesson'): rec.amount_total
+            for rec in self.exists()
+            if rec.state == 'done' and rec.start_datetime
+        }
+
+    @contextmanager
+    def _track_ledger(self, enabled=True):
+        if not enabled:
+            yield
+            return
+        before = self._ledger_contributions()
+        yield
+        self.env['rental_vehicles.revenue.ledger']._post_deltas(
+            self._name, before, self._ledger_contributions()
+        )
+
+    @api.model
+    @instrumented
+    def _find_conflicts(self, instructor_id, intervals):
+        """Интервалы [(start, end), ...], пересекающиеся с уроками инструктора - один запрос по GiST-индексу"""
+        if not (instructor_id and intervals):
+            return []
+        self.flush_model(['instructor_id', 'start_datetime', 'end_datetime', 'state'])
+        values = SQL(", ").join(
+            SQL("(%s::timestamp, %s::timestamp)", start, end) for start, end in intervals
+        )
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT i.start, i.stop
+              FROM (VALUES %(values)s) AS i (start, stop)
+              JOIN rental_vehicles_training_lesson l
+                ON l.instructor_id = %(instructor_id)s
+               AND l.state NOT IN %(inactive)s
+               AND l.lesson_range && tsrange(i.start, i.stop, '[)')
+          ORDER BY i.start
+            """,
+            values=values,
+            instructor_id=instructor_id,
+            inactive=LESSON_INACTIVE_STATES,
+        ))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _local_to_utc(self, day, hour):
+        """Дата + час в часовом поясе пользователя -> naive UTC, как хранит Odoo"""
+        local = datetime.combine(day, time(hour), tzinfo=ZoneInfo(self.env.user.tz or 'UTC'))
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+    @api.model
+    def _day_windows(self, date_from, days, hour_from=9, hour_to=19):
+        """Рабочие окна [(start, end), ...] в UTC на days дней, начиная с date_from"""
+        return [
+            (self._local_to_utc(day, hour_from), self._local_to_utc(day, hour_to))
+            for day in (date_from + timedelta(days=offset) for offset in range(days))
+        ]
+
+    @api.model
+    @instrumented
+    def _free_slots(self, windows, duration_hours, instructor_id=None, office_id=None):
+        """Свободные промежутки внутри рабочих окон windows [(start, end), ...] (UTC) - одним запросом.
+
+        Занятым считается время уроков инструктора и/или уроков офиса (если заданы оба -
+        должны быть свободны и инструктор, и площадка). Возвращает [(start, end), ...]
+        длиной не меньше duration_hours.
+        """
+        if not windows or not (instructor_id or office_id):
+            return []
+        self.flush_model(['instructor_id', 'office_id', 'start_datetime', 'end_datetime', 'state'])
+
+        resources = []
+        if instructor_id:
+            resources.append(SQL("instructor_id = %s", instructor_id))
+        if office_id:
+            resources.append(SQL("office_id = %s", office_id))
+
+        self.env.cr.execute(SQL(
+            """
+            WITH windows AS (
+                SELECT range_agg(tsrange(w.start, w.stop, '[)')) AS free
+                  FROM (VALUES %(windows)s) AS w (start, stop)
+            ), busy AS (
+                SELECT COALESCE(range_agg(lesson_range), '{}'::tsmultirange) AS taken
+                  FROM rental_vehicles_training_lesson
+                 WHERE state NOT IN %(inactive)s
+                   AND (%(resources)s)
+                   AND lesson_range && tsrange(%(date_from)s, %(date_to)s, '[)')
+            )
+            SELECT lower(slot), upper(slot)
+              FROM windows, busy, unnest(windows.free - busy.taken) AS slot
+             WHERE upper(slot) - lower(slot) >= make_interval(secs => %(duration)s)
+          ORDER BY 1
+            """,
+            windows=SQL(", ").join(
+                SQL("(%s::timestamp, %s::timestamp)", start, end) for start, end in windows
+            ),
+            inactive=LESSON_INACTIVE_STATES,
+            resources=SQL(" OR ").join(resources),
+            date_from=min(start for start, _end in windows),
+            date_to=max(end for _start, end in windows),
+            duration=duration_hours * 3600,
+        ))
+        return self.env.cr.fetchall()
 
     def action_plan(self):
         self.write({"state": "planned"})
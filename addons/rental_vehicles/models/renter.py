@@ -2,8 +2,36 @@ import requests
 import base64
 
 from odoo import models, fields, api
+from odoo.tools import SQL
 from odoo.exceptions import ValidationError, UserError
 
+from .perf_monitor import instrumented
+
+
+RENTER_IMAGE_MAX_SIZE = 1920
+RENTER_IMAGE_FIELDS = ('passport_image', 'license_image', 'image')
+
+# веса совпадений в _find_renter: точное совпадение ключа / нечёткое (similarity 0..1)
+IDENTITY_WEIGHTS = {
+    'passport_key': (100, 60),
+    'license_key': (80, 50),
+    'phone_key': (50, 30),
+}
+
+
+def normalize_document(value):
+    """'ab 12-34 56' -> 'AB123456'"""
+    if not value:
+        return False
+    return ''.join(ch for ch in value.upper() if ch.isalnum()) or False
+
+
+def normalize_phone(value):
+    """'+66 (81) 234-5678' -> '66812345678'"""
+    if not value:
+        return False
+    return ''.join(ch for ch in value if ch.isdigit()) or False
+
 
 class Renter(models.Model):
     _name = 'rental_vehicles.renter'
@@ -15,28 +43,172 @@ class Renter(models.Model):
     passport_number = fields.Char("Passport Number")
     driver_license = fields.Char("Driver License Number")
 
-    passport_image = fields.Binary("Passport Image")
-    license_image = fields.Binary("Driver License Image")
-    image = fields.Binary("Image")
+    passport_key = fields.Char(compute="_compute_identity_keys", store=True, index=True)
+    license_key = fields.Char(compute="_compute_identity_keys", store=True, index=True)
+    phone_key = fields.Char(compute="_compute_identity_keys", store=True, index=True)
+
+    # оригиналы ужимаются до 1920px при записи, в списках/канбане - только превью
+    passport_image = fields.Image("Passport Image", max_width=RENTER_IMAGE_MAX_SIZE, max_height=RENTER_IMAGE_MAX_SIZE)
+    passport_image_512 = fields.Image(related="passport_image", max_width=512, max_height=512, store=True)
+    passport_image_128 = fields.Image(related="passport_image", max_width=128, max_height=128, store=True)
+    license_image = fields.Image("Driver License Image", max_width=RENTER_IMAGE_MAX_SIZE, max_height=RENTER_IMAGE_MAX_SIZE)
+    license_image_512 = fields.Image(related="license_image", max_width=512, max_height=512, store=True)
+    license_image_128 = fields.Image(related="license_image", max_width=128, max_height=128, store=True)
+    image = fields.Image("Image", max_width=RENTER_IMAGE_MAX_SIZE, max_height=RENTER_IMAGE_MAX_SIZE)
+    image_512 = fields.Image(related="image", max_width=512, max_height=512, store=True)
+    image_128 = fields.Image(related="image", max_width=128, max_height=128, store=True)
+
+    passport_image_url = fields.Char(compute="_compute_image_urls")
+    license_image_url = fields.Char(compute="_compute_image_urls")
+    image_url = fields.Char(compute="_compute_image_urls")
 
     order_ids = fields.One2many("rental_vehicles.order", "renter_id", string="Rentals")
-    total_rentals = fields.Integer("Total Rentals", compute="_compute_total_rentals", store=True)
-    total_spent = fields.Monetary("Total Spent", compute="_compute_total_spent", store=True)
+    archived_order_ids = fields.One2many("rental_vehicles.order.archive", "renter_id", string="Archived Rentals")
+    total_rentals = fields.Integer("Total Rentals", readonly=True, copy=False)
+    total_spent = fields.Monetary("Total Spent", readonly=True, copy=False)
     currency_id = fields.Many2one("res.currency", default=lambda self: self.env.company.currency_id)
 
     active = fields.Boolean(default=True)
     note = fields.Text("Notes")
 
-    @api.depends("order_ids.status_id")
-    def _compute_total_rentals(self):
+    def init(self):
+        self.env.cr.execute("""
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            -- бывшая обёртка над оператором %: в odoo.tools.SQL он пишется как %%
+            DROP FUNCTION IF EXISTS rental_vehicles_similar(text, text);
+            CREATE INDEX IF NOT EXISTS rental_vehicles_renter_passport_key_trgm_index
+                ON rental_vehicles_renter USING gin (passport_key gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS rental_vehicles_renter_license_key_trgm_index
+                ON rental_vehicles_renter USING gin (license_key gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS rental_vehicles_renter_phone_key_trgm_index
+                ON rental_vehicles_renter USING gin (phone_key gin_trgm_ops);
+        """)
+
+    @api.depends('write_date')
+    def _compute_image_urls(self):
         for rec in self:
-            rec.total_rentals = len(rec.order_ids.filtered(lambda r: r.status_id.code == "done"))
+            for field_name in RENTER_IMAGE_FIELDS:
+                rec[f'{field_name}_url'] = rec._get_image_url(field_name)
 
-    @api.depends("order_ids.amount_total", "order_ids.status_id")
-    def _compute_total_spent(self):
+    def _get_image_url(self, field_name):
+        """Ссылка на оригинал; unique меняется с write_date, поэтому браузер может кешировать её надолго"""
+        self.ensure_one()
+        if not self.id or not self.write_date:
+            return False
+        unique = int(self.write_date.timestamp())
+        return f'/web/image/{self._name}/{self.id}/{field_name}?unique={unique}'
+
+    @api.depends('passport_number', 'driver_license', 'phone')
+    def _compute_identity_keys(self):
         for rec in self:
-            rec.total_spent = sum(
-                rec.order_ids
-                .filtered(lambda r: r.status_id.code == "done")
-                .mapped('amount_total')
-            )
+            rec.passport_key = normalize_document(rec.passport_number)
+            rec.license_key = normalize_document(rec.driver_license)
+            rec.phone_key = normalize_phone(rec.phone)
+
+    @api.model
+    @instrumented
+    def _find_renter(self, identity: dict, limit=5, fuzzy=True):
+        """Кандидаты по паспорту / правам / телефону, лучшие первыми - один запрос по индексам ключей.
+
+        identity: {'passport_number': ..., 'driver_license': ..., 'phone': ...}
+        """
+        keys = {
+            'passport_key': normalize_document(identity.get('passport_number')),
+            'license_key': normalize_document(identity.get('driver_license')),
+            'phone_key': normalize_phone(identity.get('phone')),
+        }
+        keys = {column: key for column, key in keys.items() if key}
+        if not keys:
+            return self.browse()
+
+        self.flush_model(['passport_key', 'license_key', 'phone_key', 'active'])
+
+        matches, scores = [], []
+        for column, key in keys.items():
+            exact_weight, fuzzy_weight = IDENTITY_WEIGHTS[column]
+            column_sql = SQL.identifier(column)
+            matches.append(SQL("%s = %s", column_sql, key))
+            scores.append(SQL("CASE WHEN %s = %s THEN %s ELSE 0 END", column_sql, key, exact_weight))
+            if fuzzy:
+                matches.append(SQL("%s %% %s", column_sql, key))
+                scores.append(SQL("%s * COALESCE(similarity(%s, %s), 0)", fuzzy_weight, column_sql, key))
+
+        self.env.cr.execute(SQL(
+            """
+            SELECT id
+              FROM rental_vehicles_renter
+             WHERE active
+               AND (%s)
+          ORDER BY (%s) DESC, id DESC
+             LIMIT %s
+            """,
+            SQL(" OR ").join(matches),
+            SQL(" + ").join(scores),
+            limit,
+        ))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    # total_rentals / total_spent ведутся дельтами из заказов (RentalVehiclesOrder._track_done_orders)
+
+    @api.model
+    @instrumented
+    def _apply_aggregate_deltas(self, before: dict, after: dict):
+        """Применяет разницу вкладов заказов {renter_id: [кол-во, сумма]} одним UPDATE"""
+        deltas = []
+        for renter_id in before.keys() | after.keys():
+            count_before, amount_before = before.get(renter_id, (0, 0.0))
+            count_after, amount_after = after.get(renter_id, (0, 0.0))
+            if count_after != count_before or amount_after != amount_before:
+                deltas.append((renter_id, count_after - count_before, amount_after - amount_before))
+
+        if not deltas:
+            return
+
+        self.flush_model(['total_rentals', 'total_spent'])
+        values = SQL(", ").join(SQL("(%s, %s, %s)", *delta) for delta in deltas)
+        self.env.cr.execute(SQL(
+            """
+            UPDATE rental_vehicles_renter r
+               SET total_rentals = COALESCE(r.total_rentals, 0) + d.count,
+                   total_spent = COALESCE(r.total_spent, 0) + d.amount::numeric
+              FROM (VALUES %s) AS d (renter_id, count, amount)
+             WHERE r.id = d.renter_id
+            """,
+            values,
+        ))
+        self.browse([delta[0] for delta in deltas]).invalidate_recordset(
+            ['total_rentals', 'total_spent']
+        )
+
+    @api.model
+    @instrumented
+    def _rebuild_aggregates(self):
+        """Полный пересчёт total_rentals / total_spent всех арендаторов одним GROUP BY (для починки), вместе с архивом"""
+        self.env['rental_vehicles.order'].flush_model(
+            ['renter_id', 'active', 'status_code', 'amount_total']
+        )
+        self.flush_model(['total_rentals', 'total_spent'])
+        self.env.cr.execute("""
+            UPDATE rental_vehicles_renter r
+               SET total_rentals = COALESCE(a.count, 0),
+                   total_spent = COALESCE(a.amount, 0)
+              FROM rental_vehicles_renter r2
+         LEFT JOIN (
+                SELECT renter_id,
+                       COUNT(*) AS count,
+                       SUM(amount_total) AS amount
+                  FROM (
+                        SELECT renter_id, active, status_code, amount_total
+                          FROM rental_vehicles_order
+                     UNION ALL
+                        SELECT renter_id, active, status_code, amount_total
+                          FROM rental_vehicles_order_archive
+                       ) orders
+                 WHERE active
+                   AND status_code = 'done'
+                   AND renter_id IS NOT NULL
+              GROUP BY renter_id
+              ) a ON a.renter_id = r2.id
+             WHERE r.id = r2.id
+        """)
+        self.invalidate_model(['total_rentals', 'total_spent'])
@@ -2,6 +2,10 @@ from odoo import models, fields, api, tools
 from odoo.tools import frozendict
 
 
+# поля пользователя, от которых зависят context_get и правила доступа по офисам
+USER_OFFICE_FIELDS = {'office_id', 'office_ids'}
+
+
 class ResUsers(models.Model):
     _inherit = ['res.users']
 
@@ -16,20 +20,32 @@ class ResUsers(models.Model):
     )
 
     @api.model
-    # @tools.ormcache('self.env.uid')
+    def _get_invalidation_fields(self):
+        # write() этих полей сбрасывает ormcache (context_get, _get_office_scope, ir.rule) во всех воркерах
+        return super()._get_invalidation_fields() | USER_OFFICE_FIELDS
+
+    @api.model
+    @tools.ormcache('self.env.uid')
+    def _get_office_scope(self):
+        """Офисы текущего пользователя: {'office_id': id | False, 'office_ids': (id, ...)}"""
+        user = self.env.user.sudo()
+        return frozendict({
+            "office_id": user.office_id.id,
+            "office_ids": tuple(user.office_ids.ids),
+        })
+
+    @api.model
+    @tools.ormcache('self.env.uid')
     def context_get(self):
-        user = self.env.user
         ctx = dict(super().context_get())
-        
-        office_id = False
-        
-        if user.office_id:
-            office_id = user.office_id.id
-        elif user.office_ids:
-            office_id = user.office_ids[:1].id
-        
+        scope = self._get_office_scope()
+
+        office_id = scope["office_id"]
+        if not office_id and scope["office_ids"]:
+            office_id = scope["office_ids"][0]
+
         ctx.update({
-            "allowed_office_ids": user.office_ids.ids if hasattr(user, "office_ids") else [],
+            "allowed_office_ids": list(scope["office_ids"]),
             "office_id": office_id
         })
         return frozendict(ctx)
@@ -0,0 +1,213 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+from .order import ORDER_LINE_TYPE_SELECTION
+from .perf_monitor import instrumented
+
+
+LEDGER_LINE_TYPE_SELECTION = ORDER_LINE_TYPE_SELECTION + [
+    ("lesson", "Training Lesson"),
+    ("maintenance", "Maintenance Cost"),
+]
+
+# измерения куба; ключ строки куба и группировка при переносе дельт журнала
+CUBE_DIMENSIONS = ('office_id', 'vehicle_model_id', 'vehicle_type_id', 'date', 'line_type')
+
+
+class RevenueCube(models.Model):
+    """Выручка по офис x модель x тип x день x тип строки - копится дельтами из журнала"""
+    _name = "rental_vehicles.revenue.cube"
+    _description = "Revenue Cube"
+    _order = "date desc, id desc"
+    _log_access = False
+
+    office_id = fields.Many2one("rental_vehicles.office", readonly=True)
+    vehicle_model_id = fields.Many2one("rental_vehicles.vehicle.model", string="Vehicle Model", readonly=True)
+    vehicle_type_id = fields.Many2one("rental_vehicles.vehicle.type", string="Vehicle Type", readonly=True)
+    date = fields.Date(readonly=True)
+    line_type = fields.Selection(LEDGER_LINE_TYPE_SELECTION, readonly=True)
+    currency_id = fields.Many2one(related='office_id.currency_id')
+    amount = fields.Monetary(readonly=True)
+    entry_count = fields.Integer("Entries", readonly=True)
+
+    def init(self):
+        self.env.cr.execute(SQL(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS rental_vehicles_revenue_cube_key_index
+                ON rental_vehicles_revenue_cube (%s) NULLS NOT DISTINCT
+            """,
+            SQL(", ").join(SQL.identifier(column) for column in CUBE_DIMENSIONS),
+        ))
+
+    @api.model
+    def _apply_ledger(self, ledger_ids):
+        """Добавляет строки журнала ledger_ids в куб одним upsert"""
+        if not ledger_ids:
+            return
+        dimensions = SQL(", ").join(SQL.identifier(column) for column in CUBE_DIMENSIONS)
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO rental_vehicles_revenue_cube (%(dimensions)s, amount, entry_count)
+            SELECT %(dimensions)s, SUM(amount), COUNT(*)
+              FROM rental_vehicles_revenue_ledger
+             WHERE id IN %(ledger_ids)s
+          GROUP BY %(dimensions)s
+                ON CONFLICT (%(dimensions)s)
+                DO UPDATE SET amount = rental_vehicles_revenue_cube.amount + EXCLUDED.amount,
+                              entry_count = rental_vehicles_revenue_cube.entry_count + EXCLUDED.entry_count
+            """,
+            dimensions=dimensions,
+            ledger_ids=tuple(ledger_ids),
+        ))
+        self.invalidate_model()
+
+    @api.model
+    def _consolidated(self, domain, groupby, currency):
+        """[(значения groupby, сумма в currency)] по офисам с разными валютами.
+
+        Куб читается с разбивкой по офису и дню, курсы на все (валюта, день) берутся одним запросом.
+        """
+        groups = self._read_group(
+            [*domain, ('office_id', '!=', False)], [*groupby, 'office_id', 'date:day'], ['amount:sum'],
+        )
+        amounts = self.env['rental_vehicles.currency.rate']._convert_rows(
+            [(amount, office.currency_id.id, date) for *_keys, office, date, amount in groups], currency,
+        )
+        totals = {}
+        for (*keys, _office, _date, _amount), amount in zip(groups, amounts):
+            totals[tuple(keys)] = totals.get(tuple(keys), 0.0) + amount
+        return list(totals.items())
+
+    @api.model
+    @instrumented
+    def _rebuild(self):
+        """Полная пересборка куба из журнала (для починки)"""
+        dimensions = SQL(", ").join(SQL.identifier(column) for column in CUBE_DIMENSIONS)
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM rental_vehicles_revenue_cube;
+            INSERT INTO rental_vehicles_revenue_cube (%(dimensions)s, amount, entry_count)
+            SELECT %(dimensions)s, SUM(amount), COUNT(*)
+              FROM rental_vehicles_revenue_ledger
+          GROUP BY %(dimensions)s
+            """,
+            dimensions=dimensions,
+        ))
+        self.invalidate_model()
+
+
+class RevenueLedger(models.Model):
+    """Журнал выручки: только дописывается, изменения источников приходят разницей до/после"""
+    _name = "rental_vehicles.revenue.ledger"
+    _description = "Revenue Ledger"
+    _order = "id desc"
+    _log_access = False
+
+    date = fields.Date(required=True, readonly=True, index=True)
+    source_model = fields.Char(required=True, readonly=True)
+    source_id = fields.Integer(required=True, readonly=True)
+    office_id = fields.Many2one("rental_vehicles.office", readonly=True, index=True)
+    vehicle_id = fields.Many2one("rental_vehicles.vehicle", readonly=True, ondelete="set null")
+    vehicle_model_id = fields.Many2one("rental_vehicles.vehicle.model", string="Vehicle Model", readonly=True)
+    vehicle_type_id = fields.Many2one("rental_vehicles.vehicle.type", string="Vehicle Type", readonly=True)
+    line_type = fields.Selection(LEDGER_LINE_TYPE_SELECTION, required=True, readonly=True)
+    currency_id = fields.Many2one(related='office_id.currency_id')
+    amount = fields.Monetary(readonly=True)
+    posted_at = fields.Datetime(readonly=True, default=fields.Datetime.now)
+    user_id = fields.Many2one("res.users", readonly=True, default=lambda self: self.env.uid)
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS rental_vehicles_revenue_ledger_source_index
+                ON rental_vehicles_revenue_ledger (source_model, source_id)
+        """)
+        cr.execute("SELECT 1 FROM rental_vehicles_revenue_ledger LIMIT 1")
+        if cr.fetchone():
+            return
+        # первая установка: журнал из уже закрытых заказов (вместе с архивом), уроков и ТО
+        cr.execute("""
+            INSERT INTO rental_vehicles_revenue_ledger (
+                date, source_model, source_id, office_id, vehicle_id,
+                vehicle_model_id, vehicle_type_id, line_type, amount, posted_at
+            )
+            SELECT COALESCE(o.end_date, o.start_date)::date, 'rental_vehicles.order', o.id,
+                   o.office_id, o.vehicle_id, o.vehicle_model_id, o.vehicle_type_id,
+                   l.type, SUM(l.total), now() at time zone 'UTC'
+              FROM rental_vehicles_order o
+              JOIN rental_vehicles_order_line l ON l.order_id = o.id
+             WHERE o.active AND o.status_code = 'done'
+          GROUP BY o.id, l.type
+         UNION ALL
+            SELECT COALESCE(a.end_date, a.start_date)::date, 'rental_vehicles.order', a.id,
+                   a.office_id, a.vehicle_id, v.model_id, vm.vehicle_type_id,
+                   l.type, SUM(l.total), now() at time zone 'UTC'
+              FROM rental_vehicles_order_archive a
+              JOIN rental_vehicles_order_line_archive l ON l.order_id = a.id
+         LEFT JOIN rental_vehicles_vehicle v ON v.id = a.vehicle_id
+         LEFT JOIN rental_vehicles_vehicle_model vm ON vm.id = v.model_id
+             WHERE a.active AND a.status_code = 'done'
+          GROUP BY a.id, v.model_id, vm.vehicle_type_id, l.type
+         UNION ALL
+            SELECT t.start_datetime::date, 'rental_vehicles.training.lesson', t.id,
+                   t.office_id, NULL, NULL, NULL, 'lesson', t.amount_total, now() at time zone 'UTC'
+              FROM rental_vehicles_training_lesson t
+             WHERE t.state = 'done'
+         UNION ALL
+            SELECT m.date, 'rental_vehicles.maintenance', m.id,
+                   v.office_id, m.vehicle_id, v.model_id, vm.vehicle_type_id,
+                   'maintenance', -m.total_cost, now() at time zone 'UTC'
+              FROM rental_vehicles_maintenance m
+              JOIN rental_vehicles_vehicle v ON v.id = m.vehicle_id
+         LEFT JOIN rental_vehicles_vehicle_model vm ON vm.id = v.model_id
+             WHERE COALESCE(m.total_cost, 0) <> 0
+        """)
+        self.env['rental_vehicles.revenue.cube']._rebuild()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        entries = super().create(vals_list)
+        self.flush_model()
+        self.env['rental_vehicles.revenue.cube']._apply_ledger(entries.ids)
+        return entries
+
+    def write(self, vals):
+        raise UserError("Revenue ledger is append-only.")
+
+    def unlink(self):
+        raise UserError("Revenue ledger is append-only.")
+
+    @api.model
+    def _post_deltas(self, source_model, before, after):
+        """before/after: (source_id, date, office, vehicle, модель, тип, тип строки) -> сумма.
+
+        Пишет по строке на каждый ключ, сумма которого изменилась; date=None - сегодня.
+        """
+        today = fields.Date.context_today(self)
+        vals_list = []
+        for key in before.keys() | after.keys():
+            amount = after.get(key, 0.0) - before.get(key, 0.0)
+            if not amount:
+                continue
+            source_id, date, office_id, vehicle_id, model_id, type_id, line_type = key
+            vals_list.append({
+                "date": date or today,
+                "source_model": source_model,
+                "source_id": source_id,
+                "office_id": office_id,
+                "vehicle_id": vehicle_id,
+                "vehicle_model_id": model_id,
+                "vehicle_type_id": type_id,
+                "line_type": line_type,
+                "amount": amount,
+            })
+        if vals_list:
+            self.sudo().create(vals_list)
+
+    @api.model
+    def _post_order_deltas(self, before, after):
+        """Ключи _ledger_contributions заказа: выручка датируется днём закрытия (сегодня)"""
+        def dated(contributions):
+            return {(key[0], None, *key[1:]): amount for key, amount in contributions.items()}
+        self._post_deltas("rental_vehicles.order", dated(before), dated(after))
@@ -1,4 +1,15 @@
-from odoo import models, fields, api
+from bisect import bisect_right
+from collections import defaultdict
+
+from odoo import models, fields, api, tools
+
+from .perf_monitor import instrumented
+
+
+# поля, от которых зависит лестница тарифов
+TARIFF_LADDER_FIELDS = {'office_id', 'vehicle_model_id', 'period_type', 'min_period', 'active'}
+# поля, от которых зависят суммы строк заказов (OrderLine._compute_total)
+TARIFF_TOTAL_FIELDS = {'period_type'}
 
 
 class Tariff(models.Model):
@@ -54,3 +65,107 @@ class Tariff(models.Model):
         """Автоматически ставим валюту из офиса"""
         if self.office_id and self.office_id.currency_id:
             self.currency_id = self.office_id.currency_id
+
+    @api.model
+    @tools.ormcache('office_id', 'vehicle_model_id', 'period_type')
+    def _get_tariff_ladder(self, office_id, vehicle_model_id, period_type):
+        """Отсортированные пороги min_period и id тарифов для (офис, модель, тип периода)"""
+        tariffs = self.sudo().search_fetch([
+            ('office_id', '=', office_id),
+            ('vehicle_model_id', '=', vehicle_model_id),
+            ('period_type', '=', period_type),
+        ], ['min_period'], order='min_period asc, id asc')
+        return tuple(tariffs.mapped('min_period')), tuple(tariffs.ids)
+
+    @api.model
+    def _resolve_tariff(self, office_id, vehicle_model_id, period_type, quantity):
+        """Тариф с наибольшим min_period <= quantity, поиск бисекцией по закэшированной лестнице"""
+        breakpoints, tariff_ids = self._get_tariff_ladder(office_id, vehicle_model_id, period_type)
+        index = bisect_right(breakpoints, quantity)
+        if not index:
+            return self.browse()
+        return self.browse(tariff_ids[index - 1])
+
+    @api.model
+    @instrumented
+    def _quote_batch(self, quote_requests):
+        """Цены для списка (модель, офис, дни, часы, аксессуары) одной выборкой тарифов.
+
+        Считается так же, как OrderLine._compute_total: тариф * период,
+        аксессуар * max(дни, 1).
+        """
+        quote_requests = [tuple(q) for q in quote_requests]
+        if not quote_requests:
+            return []
+
+        tariffs = self.search_fetch([
+            ('vehicle_model_id', 'in', list({q[0] for q in quote_requests})),
+            ('office_id', 'in', list({q[1] for q in quote_requests})),
+        ], ['office_id', 'vehicle_model_id', 'period_type', 'min_period', 'price_per_unit'],
+            order='min_period asc, id asc')
+
+        ladders = defaultdict(lambda: ([], []))
+        for tariff in tariffs:
+            breakpoints, prices = ladders[
+                tariff.office_id.id, tariff.vehicle_model_id.id, tariff.period_type
+            ]
+            breakpoints.append(tariff.min_period)
+            prices.append(tariff.price_per_unit)
+
+        accessory_ids = {a for q in quote_requests for a in (q[4] or ())}
+        accessories = self.env['rental_vehicles.accessory'].search_fetch(
+            [('id', 'in', list(accessory_ids))], ['default_price']
+        ) if accessory_ids else []
+        accessory_prices = {a.id: a.default_price for a in accessories}
+
+        def unit_price(key, quantity):
+            breakpoints, prices = ladders.get(key, ((), ()))
+            index = bisect_right(breakpoints, quantity)
+            return prices[index - 1] if index else False
+
+        result = []
+        for model_id, office_id, days, hours, accessory_list in quote_requests:
+            days, hours = days or 0, hours or 0
+            day_price = unit_price((office_id, model_id, 'day'), days) if days else False
+            hour_price = unit_price((office_id, model_id, 'hour'), hours) if hours else False
+            amount_tariff = (day_price or 0) * max(days, 1) + (hour_price or 0) * max(hours, 1)
+            amount_accessory = sum(
+                accessory_prices.get(a, 0) for a in (accessory_list or ())
+            ) * max(days, 1)
+            result.append({
+                'vehicle_model_id': model_id,
+                'office_id': office_id,
+                'rental_days': days,
+                'rental_hours': hours,
+                'day_price': day_price,
+                'hour_price': hour_price,
+                'amount_tariff': amount_tariff,
+                'amount_accessory': amount_accessory,
+                'amount_total': amount_tariff + amount_accessory,
+            })
+        return result
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        tariffs = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return tariffs
+
+    def write(self, vals):
+        # суммы завершённых заказов пересчитываются из-за тарифа, дельту в агрегаты арендаторов и журнал выручки
+        orders = self.env['rental_vehicles.order']
+        if TARIFF_TOTAL_FIELDS & vals.keys():
+            orders = orders.sudo().search([
+                ('order_line_ids.tariff_id', 'in', self.ids),
+                ('status_code', '=', 'done'),
+            ])
+        with orders._track_done_orders(bool(orders)):
+            res = super().write(vals)
+        if TARIFF_LADDER_FIELDS & vals.keys():
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
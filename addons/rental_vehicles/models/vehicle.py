@@ -1,5 +1,26 @@
 from odoo import models, fields, api
-from odoo.tools import format_date
+from odoo.tools import SQL, format_date
+from odoo.tools.lru import LRU
+
+from .fleet_dashboard import FLEET_CELL_VEHICLE_FIELDS
+from .order import BOOKING_STATUS_CODES
+from .perf_monitor import instrumented
+
+
+VEHICLE_STATUS_SELECTION = [
+    ("available", "Available"),
+    ("rented", "Rented"),
+    ("booked", "Booked"),
+    ("maintenance", "Maintenance"),
+    ("inactive", "Inactive"),
+]
+
+# поля машины, от которых зависит график ТО (rental_vehicles.maintenance.due)
+MAINTENANCE_DUE_VEHICLE_FIELDS = {'mileage', 'model_id', 'office_id'}
+
+# (db, lang, vehicle_id, refresh_id) -> сводка ТО; версия меняется при каждом пересчёте строк.
+# Хранятся id видов ТО, а не названия: переименование вида refresh_id не меняет
+_maintenance_due_summary_cache = LRU(4096)
 
 
 class Vehicle(models.Model):
@@ -16,13 +37,7 @@ class Vehicle(models.Model):
     purchase_price = fields.Integer()
     mileage = fields.Integer(string="Current Mileage", default=0)
     vehicle_type_id = fields.Many2one(related='model_id.vehicle_type_id')
-    status = fields.Selection([
-        ("available", "Available"),
-        ("rented", "Rented"),
-        ("booked", "Booked"),
-        ("maintenance", "Maintenance"),
-        ("inactive", "Inactive"),
-    ], default="available")
+    status = fields.Selection(VEHICLE_STATUS_SELECTION, default="available")
 
     maintenance_due_ids = fields.One2many(
         "rental_vehicles.maintenance.due",
@@ -32,6 +47,12 @@ class Vehicle(models.Model):
     )
     maintenance_ids = fields.One2many("rental_vehicles.maintenance", "vehicle_id", string="Maintenance")
     order_ids = fields.One2many("rental_vehicles.order", "vehicle_id", string="Заказы")
+    status_history_ids = fields.One2many(
+        "rental_vehicles.vehicle.status.history",
+        "vehicle_id",
+        string="Status History",
+        readonly=True,
+    )
 
     maintenance_due_summary = fields.Json(
         string="Upcoming Maintenance Summary",
@@ -52,25 +73,88 @@ class Vehicle(models.Model):
                  'maintenance_due_ids.days_to_due',
                  'maintenance_due_ids.is_due',
                  'maintenance_due_ids.overdue')
+    @instrumented
     def _compute_maintenance_due_summary(self):
+        summaries = self._get_maintenance_due_summaries()
         for vehicle in self:
-            lines = []
-            for line in vehicle.maintenance_due_ids:
-                next_service_date_str = ''
-                if line.next_service_date:
-                    next_service_date_str = format_date(
-                        line.env,
-                        line.next_service_date,
-                        date_format='MMM yy'
-                    )
-                lines.append({
-                    "service": line.service_type_id.display_name,
-                    "next_service": line.next_service_mileage or next_service_date_str,
-                    "remaining": line.km_to_due or f'{line.days_to_due} days',
-                    'is_due': line.is_due,
-                    "overdue": line.overdue,
-                })
-            vehicle.maintenance_due_summary = lines
+            vehicle.maintenance_due_summary = list(summaries.get(vehicle._origin.id, ()))
+
+    def _get_maintenance_due_summaries(self):
+        """vehicle_id -> строки сводки ТО для всего набора.
+
+        Версии строк (refresh_id) берутся одним запросом, сами строки - вторым и только
+        для машин, которых нет в кэше для текущей версии и языка. Названия видов ТО
+        подставляются при каждом вызове.
+        """
+        vehicle_ids = tuple(vid for vid in self._origin.ids if vid)
+        if not vehicle_ids:
+            return {}
+
+        cr = self.env.cr
+        cr.execute(SQL(
+            """
+            SELECT vehicle_id, MAX(refresh_id)
+              FROM rental_vehicles_maintenance_due
+             WHERE vehicle_id IN %s
+          GROUP BY vehicle_id
+            """,
+            vehicle_ids,
+        ))
+        versions = dict(cr.fetchall())
+
+        summaries, missing = {}, []
+        for vehicle_id, version in versions.items():
+            key = (cr.dbname, self.env.lang, vehicle_id, version)
+            summary = _maintenance_due_summary_cache.get(key)
+            if summary is None:
+                missing.append(vehicle_id)
+            else:
+                summaries[vehicle_id] = summary
+
+        if missing:
+            summaries.update(self._query_maintenance_due_summaries(missing, versions))
+
+        service_types = self.env['rental_vehicles.service.type'].sudo().browse({
+            line["service_type_id"] for summary in summaries.values() for line in summary
+        })
+        names = {service_type.id: service_type.name for service_type in service_types}
+        return {
+            vehicle_id: [{**line, "service": names.get(line["service_type_id"])} for line in summary]
+            for vehicle_id, summary in summaries.items()
+        }
+
+    def _query_maintenance_due_summaries(self, vehicle_ids, versions):
+        """Строки сводки ТО из таблицы с записью в кэш; вместо названия вида - service_type_id"""
+        cr = self.env.cr
+        cr.execute(SQL(
+            """
+            SELECT d.vehicle_id, d.service_type_id, d.next_service_mileage, d.next_service_date,
+                   d.km_to_due, d.days_to_due, d.is_due, d.overdue
+              FROM rental_vehicles_maintenance_due d
+             WHERE d.vehicle_id IN %s
+          ORDER BY d.id
+            """,
+            tuple(vehicle_ids),
+        ))
+        lines_by_vehicle = {vehicle_id: [] for vehicle_id in vehicle_ids}
+        for vehicle_id, service_type_id, next_mileage, next_date, km_to_due, days_to_due, is_due, overdue in cr.fetchall():
+            next_service_date_str = ''
+            if next_date:
+                next_service_date_str = format_date(self.env, next_date, date_format='MMM yy')
+            lines_by_vehicle[vehicle_id].append({
+                "service_type_id": service_type_id,
+                "next_service": next_mileage or next_service_date_str,
+                "remaining": km_to_due or f'{days_to_due} days',
+                'is_due': is_due,
+                "overdue": overdue,
+            })
+
+        summaries = {}
+        for vehicle_id, lines in lines_by_vehicle.items():
+            summary = tuple(lines)
+            _maintenance_due_summary_cache[cr.dbname, self.env.lang, vehicle_id, versions[vehicle_id]] = summary
+            summaries[vehicle_id] = summary
+        return summaries
 
     @api.depends('model_id.manufacturer_id.name', 'model_id.name', 'plate_number')
     def _compute_name(self):
@@ -83,10 +167,116 @@ class Vehicle(models.Model):
             placeholder = ' '.join(['%s'] * len(values))
             rec.name = placeholder % values if values else False
 
+    @api.model
+    @instrumented
+    def _search_available(self, office, start, end, model=None, exclude_orders=None):
+        """Свободная техника офиса на интервале [start, end) - один запрос по GiST-индексу броней"""
+        order_model = self.env['rental_vehicles.order']
+        order_model.flush_model(['vehicle_id', 'active', 'status_code', 'start_date', 'end_date'])
+        self.flush_model(['office_id', 'model_id', 'status', 'sequence'])
+
+        model_clause = SQL("AND v.model_id = %s", model.id) if model else SQL()
+        exclude_clause = (
+            SQL("AND o.id NOT IN %s", tuple(exclude_orders.ids))
+            if exclude_orders and exclude_orders.ids
+            else SQL()
+        )
+
+        self.env.cr.execute(SQL(
+            """
+            SELECT v.id
+              FROM rental_vehicles_vehicle v
+             WHERE v.office_id = %(office_id)s
+               AND v.status NOT IN ('maintenance', 'inactive')
+               %(model_clause)s
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM rental_vehicles_order o
+                     WHERE o.vehicle_id = v.id
+                       AND o.active
+                       AND o.vehicle_id IS NOT NULL
+                       AND o.status_code IN %(codes)s
+                       AND o.booking_range && tsrange(%(start)s, %(end)s, '[)')
+                       %(exclude_clause)s
+               )
+          ORDER BY v.sequence, v.id
+            """,
+            office_id=office.id,
+            model_clause=model_clause,
+            codes=BOOKING_STATUS_CODES,
+            start=start,
+            end=end,
+            exclude_clause=exclude_clause,
+        ))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _raise_mileage(self, mileage_by_vehicle: dict):
+        """Поднимает пробег до max(текущий, новый) одним UPDATE для всех машин"""
+        if not mileage_by_vehicle:
+            return
+        self.flush_model(['mileage'])
+        values = SQL(", ").join(
+            SQL("(%s, %s)", vehicle_id, mileage)
+            for vehicle_id, mileage in mileage_by_vehicle.items()
+        )
+        self.env.cr.execute(SQL(
+            """
+            UPDATE rental_vehicles_vehicle v
+               SET mileage = m.mileage,
+                   write_uid = %(uid)s,
+                   write_date = (now() at time zone 'UTC')
+              FROM (VALUES %(values)s) AS m (vehicle_id, mileage)
+             WHERE v.id = m.vehicle_id
+               AND m.mileage > COALESCE(v.mileage, 0)
+            """,
+            uid=self.env.uid,
+            values=values,
+        ))
+        vehicles = self.browse(list(mileage_by_vehicle))
+        vehicles.invalidate_recordset(['mileage', 'write_uid', 'write_date'])
+        vehicles.modified(['mileage'])
+        self.env['rental_vehicles.maintenance.due']._refresh(vehicles.ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        vehicles = super().create(vals_list)
+        self.env['rental_vehicles.maintenance.due']._refresh(vehicles.ids)
+        history = self.env['rental_vehicles.vehicle.status.history']
+        for status, group in vehicles.grouped('status').items():
+            history._log_status(group, status)
+        dashboard = self.env['rental_vehicles.fleet.dashboard']
+        dashboard._notify_cells({}, dashboard._fleet_cells(vehicles))
+        return vehicles
+
     def write(self, vals):
+        changed = self.browse()
+        previous = {}
+        if vals.get('status'):
+            changed = self.filtered(lambda v: v.status != vals['status'])
+            previous = {v.id: v.status for v in changed}
+        dashboard = self.env['rental_vehicles.fleet.dashboard']
+        cells_before = None
+        if FLEET_CELL_VEHICLE_FIELDS & vals.keys():
+            cells_before = dashboard._fleet_cells(self)
+
         res = super().write(vals)
-        if 'mileage' in vals:
-            self.flush_recordset()
+
+        if cells_before is not None:
+            dashboard._notify_cells(cells_before, dashboard._fleet_cells(self))
+
+        if MAINTENANCE_DUE_VEHICLE_FIELDS & vals.keys():
+            self.env['rental_vehicles.maintenance.due']._refresh(self.ids)
+        if changed:
+            self.env['rental_vehicles.vehicle.status.history']._log_status(
+                changed, vals['status'], previous
+            )
+        return res
+
+    def unlink(self):
+        dashboard = self.env['rental_vehicles.fleet.dashboard']
+        cells_before = dashboard._fleet_cells(self)
+        res = super().unlink()
+        dashboard._notify_cells(cells_before, {})
         return res
 
     def action_view_orders(self):
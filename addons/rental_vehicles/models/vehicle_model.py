@@ -1,13 +1,13 @@
-from odoo import models, fields, api
-from odoo.exceptions import ValidationError
+from odoo import models, fields
 
 
 class VehicleModel(models.Model):
     _name = "rental_vehicles.vehicle.model"
     _description = "Vehicle Model"
 
-    _name_manufacturer_id_unique = models.Constraint(
-        'UNIQUE(name,manufacturer_id)',
+    # без учёта регистра и пробелов по краям; проверку делает сам индекс, без запросов на запись
+    _name_lower_manufacturer_unique = models.UniqueIndex(
+        '(manufacturer_id, lower(trim(name)))',
         'Vehicle model name must be unique per manufacturer!'
     )
 
@@ -44,22 +44,6 @@ class VehicleModel(models.Model):
             rec.display_name = placeholder % values if values else False
 
 
-    @api.constrains('name', 'manufacturer_id')
-    def _check_unique_name_manufacturer(self):
-        for rec in self:
-            if not rec.name:
-                continue
-
-            domain = [
-                ('id', '!=', rec.id),
-                ('manufacturer_id', '=', rec.manufacturer_id.id),
-                ('name', '=ilike', rec.name.strip()),
-            ]
-            if self.search_count(domain):
-                raise ValidationError(
-                    f'The vehicle model "{rec.name}" already exists for this manufacturer.'
-                )
-
     def action_view_tariffs(self):
         return {
             "type": "ir.actions.act_window",
@@ -81,21 +65,6 @@ class Manufacturer(models.Model):
         string='Name',
     )
 
-    _name_unique = models.Constraint(
-        'UNIQUE(name)', 'Manufacturer name must be unique!'
+    _name_lower_unique = models.UniqueIndex(
+        '(lower(trim(name)))', 'Manufacturer name must be unique!'
     )
-
-    @api.constrains('name')
-    def _check_unique_name(self):
-        for rec in self:
-            if not rec.name:
-                continue
-
-            domain = [
-                ('id', '!=', rec.id),
-                ('name', '=ilike', rec.name.strip()),
-            ]
-            if self.search_count(domain):
-                raise ValidationError(
-                    f'The manufacturer "{rec.name}" already exists.'
-                )
@@ -0,0 +1,137 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+from .vehicle import VEHICLE_STATUS_SELECTION
+
+
+class VehicleStatusHistory(models.Model):
+    _name = "rental_vehicles.vehicle.status.history"
+    _description = "Vehicle Status History"
+    _order = "date desc, id desc"
+    _log_access = False
+
+    vehicle_id = fields.Many2one(
+        "rental_vehicles.vehicle",
+        required=True,
+        ondelete="cascade",
+        readonly=True,
+    )
+    office_id = fields.Many2one("rental_vehicles.office", readonly=True)
+    status = fields.Selection(VEHICLE_STATUS_SELECTION, required=True, readonly=True)
+    previous_status = fields.Selection(VEHICLE_STATUS_SELECTION, readonly=True)
+    date = fields.Datetime(required=True, readonly=True, default=fields.Datetime.now)
+    order_id = fields.Many2one("rental_vehicles.order", readonly=True, ondelete="set null")
+    user_id = fields.Many2one("res.users", readonly=True, default=lambda self: self.env.uid)
+
+    def init(self):
+        cr = self.env.cr
+        # журнал только дописывается, date растёт вместе с физическим порядком строк
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS rental_vehicles_vehicle_status_history_date_brin
+                ON rental_vehicles_vehicle_status_history USING brin (date);
+            CREATE INDEX IF NOT EXISTS rental_vehicles_vehicle_status_history_vehicle_date_index
+                ON rental_vehicles_vehicle_status_history (vehicle_id, date DESC, id DESC);
+        """)
+        # стартовая точка для машин без истории
+        cr.execute("""
+            INSERT INTO rental_vehicles_vehicle_status_history (vehicle_id, office_id, status, date)
+            SELECT v.id, v.office_id, COALESCE(v.status, 'available'), COALESCE(v.create_date, now() at time zone 'UTC')
+              FROM rental_vehicles_vehicle v
+             WHERE NOT EXISTS (
+                    SELECT 1
+                      FROM rental_vehicles_vehicle_status_history h
+                     WHERE h.vehicle_id = v.id
+             )
+        """)
+
+    def write(self, vals):
+        raise UserError("Vehicle status history is append-only.")
+
+    def unlink(self):
+        raise UserError("Vehicle status history is append-only.")
+
+    @api.model
+    def _log_status(self, vehicles, status, previous=None):
+        """Одна пачка строк истории на переход; order_id берётся из контекста status_history_order_ids"""
+        if not vehicles:
+            return self.browse()
+        previous = previous or {}
+        order_ids = self.env.context.get("status_history_order_ids") or {}
+        now = fields.Datetime.now()
+        return self.sudo().create([
+            {
+                "vehicle_id": vehicle.id,
+                "office_id": vehicle.office_id.id,
+                "status": status,
+                "previous_status": previous.get(vehicle.id),
+                "date": now,
+                "order_id": order_ids.get(vehicle.id),
+                "user_id": self.env.uid,
+            }
+            for vehicle in vehicles
+        ])
+
+    @api.model
+    def _status_at(self, moment, vehicle_ids=None, office_id=None):
+        """vehicle_id -> статус на момент moment, одним запросом"""
+        self.flush_model()
+        filters = SQL()
+        if vehicle_ids is not None:
+            filters = SQL("AND vehicle_id IN %s", tuple(vehicle_ids) or (0,))
+        if office_id:
+            filters = SQL("%s AND office_id = %s", filters, office_id)
+
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT ON (vehicle_id) vehicle_id, status
+              FROM rental_vehicles_vehicle_status_history
+             WHERE date <= %s
+               %s
+          ORDER BY vehicle_id, date DESC, id DESC
+            """,
+            moment,
+            filters,
+        ))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _utilization(self, vehicle_id, date_from, date_to):
+        """Секунды в каждом статусе за [date_from, date_to) и доля времени в аренде"""
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            WITH changes AS (
+                (SELECT id, status, date
+                   FROM rental_vehicles_vehicle_status_history
+                  WHERE vehicle_id = %(vehicle_id)s
+                    AND date <= %(date_from)s
+               ORDER BY date DESC, id DESC
+                  LIMIT 1)
+                UNION ALL
+                SELECT id, status, date
+                  FROM rental_vehicles_vehicle_status_history
+                 WHERE vehicle_id = %(vehicle_id)s
+                   AND date > %(date_from)s
+                   AND date < %(date_to)s
+            ),
+            intervals AS (
+                SELECT status,
+                       GREATEST(date, %(date_from)s::timestamp) AS start_date,
+                       LEAD(date, 1, %(date_to)s::timestamp) OVER (ORDER BY date, id) AS end_date
+                  FROM changes
+            )
+            SELECT status, SUM(EXTRACT(EPOCH FROM end_date - start_date))
+              FROM intervals
+          GROUP BY status
+            """,
+            vehicle_id=vehicle_id,
+            date_from=date_from,
+            date_to=date_to,
+        ))
+        seconds = {status: float(total) for status, total in self.env.cr.fetchall()}
+        period = (date_to - date_from).total_seconds()
+        return {
+            "seconds": seconds,
+            "utilization": seconds.get("rented", 0.0) / period if period > 0 else 0.0,
+        }
@@ -1,5 +1,4 @@
-from odoo import models, fields, api
-from odoo.exceptions import ValidationError
+from odoo import models, fields
 
 
 class VehicleType(models.Model):
@@ -8,21 +7,6 @@ class VehicleType(models.Model):
 
     name = fields.Char(string="Type Name", required=True)
 
-    _vehicle_type_name_unique = models.Constraint(
-        'UNIQUE(name)', 'Vehicle type name must be unique!'
+    _vehicle_type_name_lower_unique = models.UniqueIndex(
+        '(lower(trim(name)))', 'Vehicle type name must be unique!'
     )
-
-    @api.constrains('name')
-    def _check_unique_name(self):
-        for rec in self:
-            if not rec.name:
-                continue
-
-            domain = [
-                ('id', '!=', rec.id),
-                ('name', '=ilike', rec.name.strip()),
-            ]
-            if self.search_count(domain):
-                raise ValidationError(
-                    f'The vehicle type "{rec.name}" already exists.'
-                )
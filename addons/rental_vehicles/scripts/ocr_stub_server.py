@@ -0,0 +1,67 @@
+"""Заглушка OCR-сервиса для локальной разработки и тестов.
+
+Принимает POST /ocr/extract (multipart, поле file) и отвечает фиксированным JSON
+в формате rental_ocr. Только стандартная библиотека.
+
+    python3 ocr_stub_server.py --port 8001 [--delay 2] [--fail-every 3]
+
+и в Odoo: ir.config_parameter rental_vehicles.ocr_url = http://localhost:8001/ocr/extract
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+STUB_RESULT = {
+    "name": "IVAN PETROV",
+    "passport_number": "AB1234567",
+    "driver_license": "DL7654321",
+    "country": "RU",
+}
+
+
+class OcrStubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    fail_every = 0
+    calls = 0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+
+        if self.path.rstrip("/") != "/ocr/extract":
+            self.send_error(404)
+            return
+
+        type(self).calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            self.send_error(503, "stub failure")
+            return
+
+        time.sleep(self.delay)
+        body = json.dumps(STUB_RESULT).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer 503 on every Nth call")
+    args = parser.parse_args()
+
+    OcrStubHandler.delay = args.delay
+    OcrStubHandler.fail_every = args.fail_every
+    server = ThreadingHTTPServer((args.host, args.port), OcrStubHandler)
+    print(f"OCR stub listening on {args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import { Component, onWillStart, onWillUnmount, useState } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+
+const FLEET_STATUS_NOTIFICATION = "rental_vehicles.fleet_status";
+
+function cellKey(officeId, vehicleTypeId, status) {
+    return `${officeId}-${vehicleTypeId || 0}-${status}`;
+}
+
+/**
+ * Сводка парка по офисам: начальные счётчики одним RPC, дальше - пересчитанные ячейки офиса
+ * из шины (rental_vehicles.fleet.<office_id>), без периодического опроса сервера.
+ */
+export class FleetDashboard extends Component {
+    static template = "rental_vehicles.FleetDashboard";
+    static props = ["*"];
+
+    setup() {
+        this.orm = useService("orm");
+        this.busService = useService("bus_service");
+        this.state = useState({
+            offices: [],
+            vehicleTypes: [],
+            statuses: [],
+            cells: {},
+        });
+        this.channels = [];
+        this.onFleetStatus = this.onFleetStatus.bind(this);
+
+        onWillStart(() => this.load());
+        this.busService.subscribe(FLEET_STATUS_NOTIFICATION, this.onFleetStatus);
+        onWillUnmount(() => {
+            this.busService.unsubscribe(FLEET_STATUS_NOTIFICATION, this.onFleetStatus);
+            this.channels.forEach((channel) => this.busService.deleteChannel(channel));
+        });
+    }
+
+    async load() {
+        const data = await this.orm.call("rental_vehicles.fleet.dashboard", "get_dashboard_data");
+        const cells = {};
+        for (const cell of data.cells) {
+            cells[cellKey(cell.office_id, cell.vehicle_type_id, cell.status)] = { ...cell };
+        }
+        Object.assign(this.state, {
+            offices: data.offices,
+            vehicleTypes: [...data.vehicle_types, { id: false, name: "—" }],
+            statuses: data.statuses,
+            cells,
+        });
+        for (const channel of data.channels) {
+            if (!this.channels.includes(channel)) {
+                this.busService.addChannel(channel);
+                this.channels.push(channel);
+            }
+        }
+    }
+
+    onFleetStatus({ office_id, cells }) {
+        const knownOffice = this.state.offices.some((office) => office.id === office_id);
+        if (!knownOffice && !cells.length) {
+            // новый офис без машин: показывать нечего, нужна только подписка на его канал
+            if (!this.channels.includes(`rental_vehicles.fleet.${office_id}`)) {
+                this.load();
+            }
+            return;
+        }
+        // новый офис или тип машины: подписки и заголовки берём заново с сервера
+        const knownTypes = new Set(this.state.vehicleTypes.map((type) => type.id));
+        if (!knownOffice || cells.some((cell) => !knownTypes.has(cell.vehicle_type_id))) {
+            this.load();
+            return;
+        }
+        // ячейки офиса приходят целиком: счётчики, просрочки и ТО уже пересчитаны сервером
+        for (const key of Object.keys(this.state.cells)) {
+            if (this.state.cells[key].office_id === office_id) {
+                delete this.state.cells[key];
+            }
+        }
+        for (const cell of cells) {
+            this.state.cells[cellKey(cell.office_id, cell.vehicle_type_id, cell.status)] = cell;
+        }
+    }
+
+    cellsOf(officeId, vehicleTypeId) {
+        return this.state.statuses.map(
+            ([status]) => this.state.cells[cellKey(officeId, vehicleTypeId, status)]
+        );
+    }
+
+    count(officeId, vehicleTypeId, status) {
+        return this.state.cells[cellKey(officeId, vehicleTypeId, status)]?.count || 0;
+    }
+
+    rowTotal(officeId, vehicleTypeId, field) {
+        return this.cellsOf(officeId, vehicleTypeId).reduce((sum, cell) => sum + (cell?.[field] || 0), 0);
+    }
+
+    officeTypes(officeId) {
+        return this.state.vehicleTypes.filter((type) => this.rowTotal(officeId, type.id, "count"));
+    }
+}
+
+registry.category("actions").add("rental_vehicles.fleet_dashboard", FleetDashboard);
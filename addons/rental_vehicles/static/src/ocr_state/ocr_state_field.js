@@ -0,0 +1,37 @@
+import { onWillUnmount } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { pick } from "@web/core/utils/objects";
+import { SelectionField, selectionField } from "@web/views/fields/selection/selection_field";
+
+const OCR_JOB_NOTIFICATION = "rental_vehicles.ocr_job_state";
+
+/**
+ * Статус OCR в мастере фото арендатора: крон присылает в шину партнёру автора задачи
+ * уведомление о готовности, и мастер сам нажимает «Check Result» вместо ручной проверки.
+ */
+export class OcrStateField extends SelectionField {
+    setup() {
+        super.setup();
+        this.busService = useService("bus_service");
+        this.onOcrJobState = this.onOcrJobState.bind(this);
+        this.busService.subscribe(OCR_JOB_NOTIFICATION, this.onOcrJobState);
+        onWillUnmount(() => this.busService.unsubscribe(OCR_JOB_NOTIFICATION, this.onOcrJobState));
+    }
+
+    onOcrJobState({ job_id }) {
+        const record = this.props.record;
+        if (record.data.ocr_job_id?.id !== job_id || record.data.ocr_state !== "pending") {
+            return;
+        }
+        this.env.onClickViewButton({
+            clickParams: { name: "action_check_ocr", type: "object" },
+            getResParams: () => pick(record, "context", "evalContext", "resModel", "resId", "resIds"),
+        });
+    }
+}
+
+registry.category("fields").add("rental_vehicles_ocr_state", {
+    ...selectionField,
+    component: OcrStateField,
+});
@@ -0,0 +1,83 @@
+import { Component, onWillUnmount, useState } from "@odoo/owl";
+import { _t } from "@web/core/l10n/translation";
+import { registry } from "@web/core/registry";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+
+const { DateTime } = luxon;
+
+// те же пороги, что были в серверном _compute_progress_html
+const SOON_THRESHOLD_HOURS = 6;
+const REFRESH_INTERVAL_MS = 60 * 1000;
+
+/**
+ * Прогресс аренды в списке заказов: процент, цвет и подпись считаются в браузере
+ * из start_date / end_date / status_code и обновляются раз в минуту без запросов к серверу.
+ */
+export class OrderProgressField extends Component {
+    static template = "rental_vehicles.OrderProgressField";
+    static props = { ...standardFieldProps };
+
+    setup() {
+        this.clock = useState({ now: DateTime.now() });
+        const interval = setInterval(() => {
+            this.clock.now = DateTime.now();
+        }, REFRESH_INTERVAL_MS);
+        onWillUnmount(() => clearInterval(interval));
+    }
+
+    get startDate() {
+        return this.props.record.data.start_date;
+    }
+
+    get endDate() {
+        return this.props.record.data.end_date;
+    }
+
+    get percent() {
+        const start = this.startDate;
+        const end = this.endDate;
+        if (!start || !end) {
+            return 0;
+        }
+        const total = end.toMillis() - start.toMillis();
+        if (total <= 0) {
+            return 100;
+        }
+        const passed = this.clock.now.toMillis() - start.toMillis();
+        return Math.round(Math.max(0, Math.min(100, (passed / total) * 100)));
+    }
+
+    get state() {
+        if (this.props.record.data.status_code !== "active") {
+            return "idle";
+        }
+        const end = this.endDate;
+        if (!end) {
+            return "ok";
+        }
+        const now = this.clock.now;
+        if (end < now) {
+            return "overdue";
+        }
+        if (end.diff(now, "hours").hours < SOON_THRESHOLD_HOURS) {
+            return "soon";
+        }
+        return "ok";
+    }
+
+    get label() {
+        return this.endDate ? this.endDate.toFormat("d MMM HH:mm") : "";
+    }
+}
+
+export const orderProgressField = {
+    component: OrderProgressField,
+    displayName: _t("Order Progress"),
+    supportedTypes: ["datetime"],
+    fieldDependencies: [
+        { name: "start_date", type: "datetime" },
+        { name: "status_code", type: "char" },
+    ],
+};
+
+registry.category("fields").add("rental_order_progress", orderProgressField);
@@ -1 +1,5 @@
 from . import renter_photo_wizard
+from . import training_lesson_recurrence
+from . import accounting_export_wizard
+from . import fleet_import_wizard
+from . import currency_rate_import_wizard
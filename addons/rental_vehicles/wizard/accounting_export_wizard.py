@@ -0,0 +1,31 @@
+from urllib.parse import urlencode
+
+from odoo import models, fields
+
+from ..models.accounting_export import EXPORT_KIND_SELECTION, EXPORT_FORMAT_SELECTION
+
+
+class AccountingExportWizard(models.TransientModel):
+    _name = "rental_vehicles.accounting.export.wizard"
+    _description = "Accounting Export Wizard"
+
+    kind = fields.Selection(EXPORT_KIND_SELECTION, string="Export", required=True, default="orders")
+    file_format = fields.Selection(EXPORT_FORMAT_SELECTION, string="Format", required=True, default="csv")
+    date_from = fields.Date(required=True, default=lambda self: fields.Date.context_today(self).replace(day=1))
+    date_to = fields.Date(required=True, default=fields.Date.context_today)
+    office_ids = fields.Many2many("rental_vehicles.office", string="Offices", help="All available offices if empty.")
+
+    def action_export(self):
+        """Файл отдаёт контроллер /rental_vehicles/export потоком, мастер только собирает параметры"""
+        self.ensure_one()
+        params = urlencode({
+            "date_from": fields.Date.to_string(self.date_from),
+            "date_to": fields.Date.to_string(self.date_to),
+            "office_ids": ",".join(str(office_id) for office_id in self.office_ids.ids),
+            "file_format": self.file_format,
+        })
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/rental_vehicles/export/{self.kind}?{params}",
+            "target": "self",
+        }
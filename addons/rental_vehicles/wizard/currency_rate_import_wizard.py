@@ -0,0 +1,40 @@
+import base64
+
+from odoo import models, fields
+from odoo.exceptions import UserError
+
+
+class CurrencyRateImportWizard(models.TransientModel):
+    _name = "rental_vehicles.currency.rate.import.wizard"
+    _description = "Currency Rate Import Wizard"
+
+    file = fields.Binary(help="CSV with columns currency, date, rate (units per 1 USD).")
+    filename = fields.Char()
+    date = fields.Date(default=fields.Date.context_today, help="Date of rates fetched from the provider.")
+
+    def _done(self, stored):
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "message": f"{stored} currency rates stored.",
+                "type": "success",
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
+
+    def action_import_file(self):
+        self.ensure_one()
+        if not self.file:
+            raise UserError("Upload a CSV file first.")
+        try:
+            content = base64.b64decode(self.file)
+            stored = self.env['rental_vehicles.currency.rate']._import_csv(content)
+        except UnicodeDecodeError as error:
+            raise UserError(f"Could not read the file: {error}")
+        return self._done(stored)
+
+    def action_fetch(self):
+        self.ensure_one()
+        rates = self.env['rental_vehicles.currency.rate']
+        return self._done(rates._store_rates(rates._fetch_provider_rates(self.date), "provider"))
@@ -0,0 +1,46 @@
+import base64
+import csv
+
+from odoo import models, fields
+from odoo.exceptions import UserError
+
+
+class FleetImportWizard(models.TransientModel):
+    _name = "rental_vehicles.fleet.import.wizard"
+    _description = "Fleet Import Wizard"
+
+    file = fields.Binary(required=True)
+    filename = fields.Char()
+    office_id = fields.Many2one(
+        "rental_vehicles.office",
+        required=True,
+        default=lambda self: self.env.context.get("office_id") or self.env.user.office_id,
+    )
+    result = fields.Text(readonly=True)
+    error_report = fields.Binary(readonly=True)
+    error_report_filename = fields.Char(default="fleet_import_errors.csv")
+
+    def action_import(self):
+        """Всё, что прошло проверки, создаётся пачками; отклонённые строки уходят в отчёт об ошибках"""
+        self.ensure_one()
+        fleet_import = self.env['rental_vehicles.fleet.import']
+        try:
+            rows = fleet_import._read_file(base64.b64decode(self.file), self.filename)
+        except (UnicodeDecodeError, ValueError, csv.Error) as error:
+            raise UserError(f"Could not read the file: {error}")
+        if not rows:
+            raise UserError("The file has no rows.")
+
+        counts, errors = fleet_import._import_rows(rows, self.office_id)
+        summary = ", ".join(f"{label.replace('_', ' ')}: {count}" for label, count in counts.items())
+        self.write({
+            "result": f"Created {summary}. Rejected rows: {len(errors)} of {len(rows)}.",
+            "error_report": base64.b64encode(fleet_import._error_report(errors)) if errors else False,
+        })
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
@@ -1,6 +1,5 @@
 from odoo import models, fields, api
 from odoo.exceptions import UserError
-import base64, requests
 import logging
 
 
@@ -13,29 +12,47 @@ class RenterPhotoWizard(models.TransientModel):
 
     image = fields.Binary("Image", required=True)
     image_filename = fields.Char()
-    renter_id = fields.Many2one("rental_vehicles.renter", string="Detected Renter", readonly=True)
+    renter_id = fields.Many2one("rental_vehicles.renter", string="Detected Renter")
+    candidate_ids = fields.Many2many("rental_vehicles.renter", string="Similar Renters", readonly=True)
     name = fields.Char("Name")
     passport_number = fields.Char("Passport Number")
     driver_license = fields.Char("Driver License")
     phone = fields.Char("Phone")
     country = fields.Char("Country")
     order_id = fields.Many2one("rental_vehicles.order", string="Order")
+    ocr_job_id = fields.Many2one("rental_vehicles.ocr.job", readonly=True)
+    ocr_state = fields.Selection(related="ocr_job_id.state", string="OCR Status")
+
+    def _reopen(self):
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": "rental_vehicles.renter.photo.wizard",
+            "view_mode": "form",
+            "res_id": self.id,
+            "target": "new",
+        }
 
     def action_extract_data(self):
-        """Отправляем фото в OCR-сервис"""
+        """Ставим фото в очередь OCR, результат забираем через action_check_ocr"""
         if not self.image:
             raise UserError("Please upload a image before extracting data.")
 
-        try:
-            response = requests.post(
-                "http://rental_ocr:8000/ocr/extract",
-                files={"file": ("photo.jpg", base64.b64decode(self.image))}
-            )
-            response.raise_for_status()
-            data = response.json()
-            _logger.info(data)
-        except Exception as e:
-            raise UserError(f"OCR service error: {str(e)}")
+        self.ocr_job_id = self.env["rental_vehicles.ocr.job"]._enqueue(self.image)
+        return self._reopen()
+
+    def action_check_ocr(self):
+        """Проверяем задачу OCR и, если готово, заполняем распознанные данные"""
+        job = self.ocr_job_id
+        if not job:
+            raise UserError("Please extract data first.")
+        if job.state == "failed":
+            raise UserError(f"OCR service error: {job.error}")
+        if job.state == "done":
+            self._apply_ocr_result(job.result or {})
+        return self._reopen()
+
+    def _apply_ocr_result(self, data):
+        _logger.info(data)
 
         # Заполняем распознанные данные
         self.name = data.get("name")
@@ -43,23 +60,17 @@ class RenterPhotoWizard(models.TransientModel):
         self.driver_license = data.get("driver_license")
         self.country = data.get("country")
 
-        # Ищем существующего арендатора
-        renter = self.env["rental_vehicles.renter"].search([
-            "|",
-            ("passport_number", "=", self.passport_number),
-            ("driver_license", "=", self.driver_license)
-        ], limit=1)
-
-        if renter:
-            self.renter_id = renter.id
-
-        return {
-            "type": "ir.actions.act_window",
-            "res_model": "rental_vehicles.renter.photo.wizard",
-            "view_mode": "form",
-            "res_id": self.id,
-            "target": "new",
+        # Арендатор подставляется только при точном совпадении нормализованного ключа;
+        # похожие по триграммам - лишь список, из которого выбирает пользователь
+        identity = {
+            "passport_number": self.passport_number,
+            "driver_license": self.driver_license,
+            "phone": self.phone,
         }
+        Renter = self.env["rental_vehicles.renter"]
+        exact = Renter._find_renter(identity, limit=1, fuzzy=False)
+        self.renter_id = exact[:1]
+        self.candidate_ids = exact or Renter._find_renter(identity)
 
     def action_confirm(self):
         """Создать или выбрать арендатора и присвоить заказу"""
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import format_datetime
+
+
+WEEKDAY_FIELDS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+class TrainingLessonRecurrence(models.TransientModel):
+    _name = "rental_vehicles.training.lesson.recurrence"
+    _description = "Recurring Training Lessons"
+
+    name = fields.Char(string="Subject", required=True, default="Training Lesson")
+    instructor_id = fields.Many2one("res.users", string="Instructor", required=True, default=lambda self: self.env.user)
+    office_id = fields.Many2one(
+        "rental_vehicles.office",
+        required=True,
+        default=lambda self: self.env.context.get("office_id") or self.env.user.office_id,
+    )
+    date_start = fields.Date(required=True, default=fields.Date.context_today)
+    weeks = fields.Integer(required=True, default=8)
+    start_hour = fields.Integer(required=True, default=9)
+    duration_hours = fields.Float(string="Duration", required=True, default=1.0)
+    price_per_hour = fields.Monetary(default=60)
+    currency_id = fields.Many2one(related='office_id.currency_id')
+
+    mon = fields.Boolean("Mon")
+    tue = fields.Boolean("Tue")
+    wed = fields.Boolean("Wed")
+    thu = fields.Boolean("Thu")
+    fri = fields.Boolean("Fri")
+    sat = fields.Boolean("Sat")
+    sun = fields.Boolean("Sun")
+
+    @api.constrains('weeks', 'start_hour', 'duration_hours')
+    def _check_schedule(self):
+        for rec in self:
+            if rec.weeks <= 0:
+                raise ValidationError("Number of weeks must be positive.")
+            if not 0 <= rec.start_hour <= 23:
+                raise ValidationError("Start hour must be between 0 and 23.")
+            if not 0 < rec.duration_hours < 24:
+                raise ValidationError("Duration must be between 0 and 24 hours.")
+
+    def _get_intervals(self):
+        """[(start, end), ...] в UTC для всех уроков серии"""
+        self.ensure_one()
+        weekdays = {index for index, name in enumerate(WEEKDAY_FIELDS) if self[name]}
+        if not weekdays:
+            raise UserError("Select at least one weekday.")
+
+        lesson_model = self.env['rental_vehicles.training.lesson']
+        duration = timedelta(hours=self.duration_hours)
+        intervals = []
+        for offset in range(self.weeks * 7):
+            day = self.date_start + timedelta(days=offset)
+            if day.weekday() in weekdays:
+                start = lesson_model._local_to_utc(day, self.start_hour)
+                intervals.append((start, start + duration))
+        return intervals
+
+    def action_generate(self):
+        """Создаёт всю серию одним create после одной проверки пересечений"""
+        self.ensure_one()
+        intervals = self._get_intervals()
+        lesson_model = self.env['rental_vehicles.training.lesson']
+
+        conflicts = lesson_model._find_conflicts(self.instructor_id.id, intervals)
+        if conflicts:
+            busy = ", ".join(format_datetime(self.env, start, dt_format="EEE d MMM HH:mm") for start, _end in conflicts)
+            raise ValidationError(f"{self.instructor_id.name} already has lessons at: {busy}")
+
+        lessons = lesson_model.create([
+            {
+                "name": self.name,
+                "instructor_id": self.instructor_id.id,
+                "office_id": self.office_id.id,
+                "start_datetime": start,
+                "duration_hours": self.duration_hours,
+                "price_per_hour": self.price_per_hour,
+                "state": "planned",
+            }
+            for start, _end in intervals
+        ])
+        return {
+            "type": "ir.actions.act_window",
+            "name": self.name,
+            "res_model": lesson_model._name,
+            "view_mode": "list,calendar,form",
+            "domain": [("id", "in", lessons.ids)],
+        }